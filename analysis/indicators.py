@@ -0,0 +1,154 @@
+"""
+Streaming moving averages (SMA/CMA/EMA) over one price or volume series.
+
+A MovingAverages object keeps O(1)-per-row state between calls: the running
+count and sum for the CMA, the last max(window) - 1 values for the SMAs and
+the EMA numerator/denominator carry. Missing values are skipped the way
+pandas skips them, so a gap never spreads past the windows that hold it.
+Feeding it the rows added by a daily refresh extends every indicator
+without touching the earlier history. Each block of rows is handled for
+all windows in one vectorized pass.
+
+Results match pandas `rolling(w).mean()` (NaN while the window holds a
+gap), `expanding().mean()` and `ewm(span=w).mean()` (gaps still age the
+older weights, as with ignore_na=False).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+PRESET_WINDOWS = (5, 10, 20, 50, 200)
+
+
+class MovingAverages:
+    """
+    Incremental SMA/CMA/EMA state for one series.
+
+    `sma` and `ema` are iterables of window lengths (EMA windows are spans).
+    Call update() with each new block of values, oldest first.
+    """
+
+    def __init__(self, sma=PRESET_WINDOWS, ema=PRESET_WINDOWS, cma=True):
+        self.sma = tuple(sorted(set(int(w) for w in sma)))
+        self.ema = tuple(sorted(set(int(w) for w in ema)))
+        self.cma = cma
+        if any(w < 1 for w in self.sma + self.ema):
+            raise ValueError("windows must be positive")
+        self.count = 0
+        self.valid = 0
+        self.total = 0.0
+        self.tail = np.empty(0)
+        self.decay = np.array([1 - 2 / (w + 1) for w in self.ema])
+        self.ema_num = np.zeros(len(self.ema))
+        self.ema_den = np.zeros(len(self.ema))
+
+    def columns(self):
+        return [f"SMA{w}" for w in self.sma] + (["CMA"] if self.cma else []) + [f"EMA{w}" for w in self.ema]
+
+    def update(self, values):
+        """
+        Advances the state by `values` and returns {column: array} holding
+        every indicator for those rows
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        n = len(values)
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        out = {}
+        if self.sma:
+            # Prefix sums of the values and of the gaps over the carried tail
+            # plus the new rows give every window's sum and gap count for the
+            # new rows as one difference each
+            joined = np.concatenate([self.tail, values])
+            gaps = np.concatenate([[0], np.cumsum(np.isnan(joined))])
+            sums = np.concatenate([[0.0], np.cumsum(np.nan_to_num(joined))])
+            end = np.arange(len(self.tail) + 1, len(joined) + 1)
+            for w in self.sma:
+                start = np.maximum(end - w, 0)
+                full = (end - start) - (gaps[end] - gaps[start]) >= w
+                out[f"SMA{w}"] = np.where(full, (sums[end] - sums[start]) / w, np.nan)
+            self.tail = joined[-(self.sma[-1] - 1):] if self.sma[-1] > 1 else joined[:0]
+        if self.cma:
+            running = self.total + np.cumsum(filled)
+            counts = self.valid + np.cumsum(present)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out["CMA"] = np.where(counts > 0, running / counts, np.nan)
+            if n:
+                self.total = running[-1]
+        if self.ema:
+            # scipy loads on the first EMA, not with the page
+            from scipy.signal import lfilter
+        for i, (w, beta) in enumerate(zip(self.ema, self.decay)):
+            # Same weights as pandas' adjust=True: sum(beta^k x_{t-k}) / sum(beta^k)
+            # over the values present, with gaps still counting towards k
+            num, _ = lfilter([1.0], [1.0, -beta], filled, zi=[beta * self.ema_num[i]])
+            den, _ = lfilter([1.0], [1.0, -beta], present.astype(np.float64), zi=[beta * self.ema_den[i]])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[f"EMA{w}"] = np.where(den > 0, num / den, np.nan)
+            if n:
+                self.ema_num[i], self.ema_den[i] = num[-1], den[-1]
+        self.valid += int(present.sum())
+        self.count += n
+        return out
+
+
+def moving_averages(values, sma=PRESET_WINDOWS, ema=PRESET_WINDOWS, cma=True, index=None):
+    """
+    One-shot helper: every requested indicator over `values` as a DataFrame
+    """
+    state = MovingAverages(sma, ema, cma)
+    return pd.DataFrame(state.update(values), index=index, columns=state.columns())
+
+
+class IndicatorCache:
+    """
+    Indicator history for one (symbol, column) series that grows with the data.
+
+    extend() takes the full, date-indexed series, feeds only the rows after
+    the last one it has seen into the running state and appends the result.
+    Windows asked for the first time are computed over the full history once,
+    then carried forward like the rest. Hold `lock` while using a shared
+    instance.
+    """
+
+    def __init__(self):
+        self.lock = getattr(self, "lock", None) or threading.Lock()
+        self.states = []
+        self.frame = pd.DataFrame()
+        self.series = pd.Series(dtype=np.float64)
+
+    def windows(self, kind):
+        return {w for state in self.states for w in getattr(state, kind.lower())}
+
+    def extend(self, series):
+        if not series.index.is_monotonic_increasing:
+            series = series.sort_index()
+        if len(self.series) and (len(series) < len(self.series) or series.index[len(self.series) - 1] != self.series.index[-1]):
+            # History was rewritten rather than appended to, so start again
+            self.__init__()
+        new = series.iloc[len(self.series):]
+        if len(new):
+            parts = [pd.DataFrame(state.update(new.to_numpy()), index=new.index, columns=state.columns()) for state in self.states]
+            if parts:
+                self.frame = pd.concat([self.frame, pd.concat(parts, axis=1)])
+            self.series = series
+        return self
+
+    def request(self, sma=(), ema=(), cma=False):
+        """
+        Makes sure the given windows are tracked, computing any new ones
+        over the stored history in one pass
+        """
+        sma = set(sma) - self.windows("SMA")
+        ema = set(ema) - self.windows("EMA")
+        cma = cma and "CMA" not in self.frame.columns
+        if sma or ema or cma:
+            state = MovingAverages(sma, ema, cma)
+            added = pd.DataFrame(state.update(self.series.to_numpy()), index=self.series.index, columns=state.columns())
+            self.states.append(state)
+            self.frame = self.frame.join(added) if len(self.frame.columns) else added
+        return self
+
+    def get(self, columns):
+        return self.frame[list(columns)]
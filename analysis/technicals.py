@@ -0,0 +1,238 @@
+"""
+Technical indicators over a dates x symbols panel.
+
+Every field of a Panel is a (dates, symbols) float64 array aligned on the
+union of trading dates, with NaN where a symbol has no row. Each indicator
+is a handful of whole-array operations (prefix sums, one lfilter call
+along the date axis) that cover the whole index at once, so screening all
+NIFTY-50 stocks costs about as much as a single one.
+
+Rolling results are NaN until a full window of valid rows is available.
+The recursive indicators (EMA, MACD, RSI, ATR) run over forward-filled
+input, so a missing row counts as a repeat of the previous value, and
+report NaN on missing rows.
+"""
+import numpy as np
+import pandas as pd
+
+PANEL_COLUMNS = ("OPEN", "HIGH", "LOW", "CLOSE", "VWAP", "VOLUME")
+
+
+class Panel:
+    """
+    Aligned (dates, symbols) arrays, one per column
+    """
+
+    def __init__(self, dates, symbols, fields):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.fields = fields
+
+    def __getitem__(self, column):
+        return self.fields[column]
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.symbols)
+
+    def frame(self, values):
+        """
+        Wraps a (dates, symbols) result in a DataFrame
+        """
+        return pd.DataFrame(values, index=self.dates, columns=self.symbols)
+
+    def latest(self, values):
+        """
+        Each symbol's last non-NaN value, e.g. for a daily screen
+        """
+        valid = ~np.isnan(values)
+        last = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+        out = values[last, np.arange(values.shape[1])]
+        return pd.Series(np.where(valid.any(axis=0), out, np.nan), index=self.symbols)
+
+
+def panel_from_frames(frames, columns=PANEL_COLUMNS):
+    """
+    Builds a Panel from {symbol: DataFrame with DATE and `columns`}
+    """
+    symbols = list(frames)
+    dates = np.unique(np.concatenate([frames[s]["DATE"].to_numpy(dtype="datetime64[ns]") for s in symbols])) \
+        if symbols else np.array([], dtype="datetime64[ns]")
+    fields = {c: np.full((len(dates), len(symbols)), np.nan) for c in columns}
+    for j, symbol in enumerate(symbols):
+        df = frames[symbol]
+        rows = np.searchsorted(dates, df["DATE"].to_numpy(dtype="datetime64[ns]"))
+        for c in columns:
+            fields[c][rows, j] = df[c].to_numpy(dtype=np.float64)
+    return Panel(dates, symbols, fields)
+
+
+def load_panel(source, symbols, columns=PANEL_COLUMNS, start=None, end=None):
+    """
+    Loads `symbols` through `source.load(symbol, columns, start, end)`
+    (e.g. the app's Catalog) into a Panel
+    """
+    return panel_from_frames({s: source.load(s, ["DATE"] + list(columns), start, end) for s in symbols}, columns)
+
+
+def _ffill(x):
+    """
+    Forward-fills NaNs down each column; leading NaNs stay
+    """
+    index = np.where(np.isnan(x), 0, np.arange(len(x))[:, np.newaxis])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return x[index, np.arange(x.shape[1])]
+
+
+def rolling_sum(x, window):
+    """
+    Trailing `window`-row sums from one prefix sum; NaN if the window has a gap
+    """
+    missing = np.isnan(x)
+    sums = np.cumsum(np.where(missing, 0.0, x), axis=0)
+    gaps = np.cumsum(missing, axis=0)
+    out = np.full(x.shape, np.nan)
+    if window <= len(x):
+        out[window - 1:] = sums[window - 1:]
+        out[window:] -= sums[:-window]
+        span_gaps = gaps[window - 1:].copy()
+        span_gaps[1:] -= gaps[:-window]
+        out[window - 1:][span_gaps > 0] = np.nan
+    return out
+
+
+def rolling_mean(x, window):
+    return rolling_sum(x, window) / window
+
+
+def rolling_std(x, window, ddof=0):
+    """
+    Trailing standard deviation from the rolling sums of x and x^2; NaN if
+    the window has a gap
+    """
+    # Centering on each symbol's first value keeps the sums of squares small
+    first = np.argmax(~np.isnan(x), axis=0)
+    x = x - np.nan_to_num(x[first, np.arange(x.shape[1])])
+    sums = rolling_sum(x, window)
+    squares = rolling_sum(x * x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (squares - sums * sums / window) / (window - ddof)
+    # Rounding can leave a flat window slightly below zero
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def ema(x, span=None, alpha=None):
+    """
+    Recursive EMA y[t] = alpha * x[t] + (1 - alpha) * y[t-1], seeded with each
+    symbol's first value (pandas `ewm(adjust=False)`). Runs along the date
+    axis for all symbols in one filter call.
+    """
+    from scipy.signal import lfilter
+
+    if alpha is None:
+        alpha = 2 / (span + 1)
+    missing = np.isnan(x)
+    filled = _ffill(x)
+    # Leading gaps take the first valid value, so the filter starts flat
+    first = np.argmax(~missing, axis=0)
+    seed = filled[first, np.arange(x.shape[1])]
+    filled = np.where(np.arange(len(x))[:, np.newaxis] < first, seed, filled)
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], np.nan_to_num(filled), axis=0, zi=((1 - alpha) * np.nan_to_num(seed))[np.newaxis])
+    out[missing] = np.nan
+    return out
+
+
+def _shift(x, periods=1):
+    out = np.full(x.shape, np.nan)
+    out[periods:] = x[:-periods]
+    return out
+
+
+def rsi(close, window=14):
+    """
+    Wilder's relative strength index, 0-100
+    """
+    change = close - _shift(_ffill(close))
+    gain = ema(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), alpha=1 / window)
+    loss = ema(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), alpha=1 / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 - 100 / (1 + gain / loss)
+    out[loss == 0] = 100.0
+    out[np.isnan(gain)] = np.nan
+    # The first `window` values are still dominated by the seed
+    seen = np.cumsum(~np.isnan(change), axis=0)
+    out[seen < window] = np.nan
+    return out
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    Returns (macd line, signal line, histogram)
+    """
+    line = ema(close, fast) - ema(close, slow)
+    trigger = ema(line, signal)
+    return line, trigger, line - trigger
+
+
+def bollinger(close, window=20, k=2.0):
+    """
+    Returns (middle, upper, lower) bands around the `window`-day SMA
+    """
+    middle = rolling_mean(close, window)
+    width = k * rolling_std(close, window)
+    return middle, middle + width, middle - width
+
+
+def true_range(high, low, close):
+    """
+    max(high - low, |high - previous close|, |low - previous close|)
+    """
+    previous = _shift(_ffill(close))
+    # fmax skips the missing previous close on a symbol's first row
+    return np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+
+
+def atr(high, low, close, window=14):
+    """
+    Wilder's average true range
+    """
+    return ema(true_range(high, low, close), alpha=1 / window)
+
+
+def rolling_vwap(vwap, volume, window=20):
+    """
+    Volume-weighted average price over the last `window` sessions, built
+    from each day's VWAP and traded volume
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return rolling_sum(vwap * volume, window) / rolling_sum(volume, window)
+
+
+def volatility(close, window=20, periods_per_year=252):
+    """
+    Annualized rolling standard deviation of daily log returns
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.log(close / _shift(_ffill(close)))
+    return rolling_std(returns, window, ddof=1) * np.sqrt(periods_per_year)
+
+
+def screen(panel):
+    """
+    Every indicator over the whole panel as {name: (dates, symbols) array}
+    """
+    close = panel["CLOSE"]
+    line, trigger, hist = macd(close)
+    middle, upper, lower = bollinger(close)
+    return {
+        "RSI14": rsi(close),
+        "MACD": line,
+        "MACD_SIGNAL": trigger,
+        "MACD_HIST": hist,
+        "BB_MIDDLE": middle,
+        "BB_UPPER": upper,
+        "BB_LOWER": lower,
+        "ATR14": atr(panel["HIGH"], panel["LOW"], close),
+        "VWAP20": rolling_vwap(panel["VWAP"], panel["VOLUME"]),
+        "VOLATILITY20": volatility(close),
+    }
@@ -1,18 +1,23 @@
-import pandas as pd
 import streamlit as st
 import sys
 import os
 from datetime import datetime, date
-import plotly.express as px
 
 # Add the directory containing niftyScrape.py to the Python path
-sys.path.append(os.path.abspath("scraper"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
 
 import niftyScrape
-from helper import delete_files_except_one
+from helper import csv_path, NIFTY_50
+from catalog import get_catalog
+from charts import line_figure, show, paginated_table
+import registry
 
 st.set_page_config(page_title="StockiPy", page_icon="🐍")
 
+# Opt-in warm start so the first prediction does not pay for model loading
+if os.environ.get("STOCKIPY_PRELOAD_MODELS"):
+    registry.preload_in_background()
+
 
 
 # Custom CSS for styling and animations
@@ -78,68 +83,28 @@ def scrapeData(starting_date, ending_date, stock):
     symbol = stock
     fromDate = datetime.combine(starting_date, datetime.min.time())
     tillDate = datetime.combine(ending_date, datetime.min.time())
-    outputPath = f"/home/ariyaman/learntocode/Stockipy/data/historical_stock_data_{symbol}.csv"
-    
-    def progressCallback(progress):
-        progress_bar.progress(progress)
+    catalog = get_catalog()
+
+    status = st.empty()
+
+    def progressCallback(done, total):
+        status.text(f"Fetched {done} of {total} chunks")
 
-    
-    niftyScrape.stock_csv(symbol, fromDate, tillDate, series="EQ", output=outputPath, show_progress=True, progress_callback=progressCallback)
-    
-    return outputPath
+    if catalog.covers(symbol, starting_date, ending_date):
+        return
+
+    # Symbols already in the catalog only need the days after their last stored date
+    entry = catalog.get(symbol)
+    incremental = entry is not None and entry["format"] == "store" and catalog.covers(symbol, starting_date)
+    niftyScrape.stock_csv(symbol, fromDate, tillDate, series="EQ", output=csv_path(symbol), show_progress=True,
+                          progress_callback=progressCallback, incremental=incremental,
+                          store=catalog.store, export_csv=False)
+    catalog.register(symbol, scraped=(starting_date, ending_date))
 
 # Page title and description with animation and color
 st.markdown('<h1 class="center fadeIn header">StockiPy</h1>', unsafe_allow_html=True)
 st.markdown('<h3 class="center slideIn subheader">Stock Price Predictor</h3>', unsafe_allow_html=True)
 
-nifty_50_stocks = {
-    "ADANIPORTS": "Adani Ports and Special Economic Zone Ltd",
-    "ASIANPAINT": "Asian Paints Ltd",
-    "AXISBANK": "Axis Bank Ltd",
-    "BAJAJ-AUTO": "Bajaj Auto Ltd",
-    "BAJFINANCE": "Bajaj Finance Ltd",
-    "BAJAJFINSV": "Bajaj Finserv Ltd",
-    "BPCL": "Bharat Petroleum Corporation Ltd",
-    "BHARTIARTL": "Bharti Airtel Ltd",
-    "BRITANNIA": "Britannia Industries Ltd",
-    "CIPLA": "Cipla Ltd",
-    "COALINDIA": "Coal India Ltd",
-    "DIVISLAB": "Divi's Laboratories Ltd",
-    "DRREDDY": "Dr. Reddy's Laboratories Ltd",
-    "EICHERMOT": "Eicher Motors Ltd",
-    "GRASIM": "Grasim Industries Ltd",
-    "HCLTECH": "HCL Technologies Ltd",
-    "HDFCBANK": "HDFC Bank Ltd",
-    "HDFC": "Housing Development Finance Corporation Ltd",
-    "HEROMOTOCO": "Hero MotoCorp Ltd",
-    "HINDALCO": "Hindalco Industries Ltd",
-    "HINDUNILVR": "Hindustan Unilever Ltd",
-    "ICICIBANK": "ICICI Bank Ltd",
-    "ITC": "ITC Ltd",
-    "INDUSINDBK": "IndusInd Bank Ltd",
-    "INFY": "Infosys Ltd",
-    "JSWSTEEL": "JSW Steel Ltd",
-    "KOTAKBANK": "Kotak Mahindra Bank Ltd",
-    "LT": "Larsen & Toubro Ltd",
-    "M&M": "Mahindra & Mahindra Ltd",
-    "MARUTI": "Maruti Suzuki India Ltd",
-    "NTPC": "NTPC Ltd",
-    "NESTLEIND": "Nestle India Ltd",
-    "ONGC": "Oil and Natural Gas Corporation Ltd",
-    "POWERGRID": "Power Grid Corporation of India Ltd",
-    "RELIANCE": "Reliance Industries Ltd",
-    "SBIN": "State Bank of India",
-    "SUNPHARMA": "Sun Pharmaceutical Industries Ltd",
-    "TCS": "Tata Consultancy Services Ltd",
-    "TATAMOTORS": "Tata Motors Ltd",
-    "TATASTEEL": "Tata Steel Ltd",
-    "TECHM": "Tech Mahindra Ltd",
-    "TITAN": "Titan Company Ltd",
-    "ULTRACEMCO": "UltraTech Cement Ltd",
-    "UPL": "UPL Ltd",
-    "WIPRO": "Wipro Ltd"
-}
-
 stockExchange = {
     "NSE": "National Stock Exchange",
     "BSE": "Bombay Stock Exchange",
@@ -148,8 +113,8 @@ stockExchange = {
 left, right = st.columns(2)
 
 with left:
-    stockSymbol = st.selectbox("Select the Stock you'd like to predict", list(nifty_50_stocks.keys()))
-    companyName = nifty_50_stocks[stockSymbol]
+    stockSymbol = st.selectbox("Select the Stock you'd like to predict", list(NIFTY_50.keys()))
+    companyName = NIFTY_50[stockSymbol]
     st.write(f"You selected: {stockSymbol} - {companyName}")
 
 with right:
@@ -164,19 +129,24 @@ ending_date = st.date_input("Ending Date", date(2024, 6, 27))
 scrape = st.button("Scrape Data")
 
 if scrape:
-    path = scrapeData(starting_date, ending_date, stockSymbol)
-    data = pd.read_csv(path)
-
-    # Data styling
-    st.dataframe(data.style.highlight_max(axis=0, color='orange'))
+    scrapeData(starting_date, ending_date, stockSymbol)
+    entry = get_catalog().get(stockSymbol)
+    if entry and entry["rows"]:
+        st.session_state["symbol"] = stockSymbol
+        st.session_state["scraped"] = (stockSymbol, starting_date, ending_date)
+    else:
+        # e.g. a range of holidays, or a symbol after it was delisted
+        st.warning(f"NSE returned no {stockSymbol} rows between {starting_date} and {ending_date}.")
+
+# Keep showing the last scrape while the user pages through the table
+if "scraped" in st.session_state:
+    scrapedSymbol, scrapedStart, scrapedEnd = st.session_state["scraped"]
+    data = get_catalog().load(scrapedSymbol, start=scrapedStart, end=scrapedEnd)
+
+    # Data styling, one page at a time
+    paginated_table(data, highlight='orange', key='scraped')
 
     # Plot the data
-    fig = px.line(data, x='DATE', y='CLOSE', title=f'{stockSymbol} Closing Prices')
-    st.plotly_chart(fig)
-    
-    st.write("You Can Now move to the Analysis Page")
+    show(line_figure(data['DATE'], {'CLOSE': (data['CLOSE'], '#636EFA')}, title=f'{scrapedSymbol} Closing Prices', ylabel='CLOSE'))
 
-    # Clean up
-    folder_path = "../data"
-    file_to_keep = f"historical_stock_data_{stockSymbol}.csv"
-    delete_files_except_one(folder_path, file_to_keep)
\ No newline at end of file
+    st.write("You Can Now move to the Analysis Page")
@@ -0,0 +1,177 @@
+import os
+import json
+import threading
+from datetime import datetime, date, timedelta
+
+import pandas as pd
+from pandas.tseries.offsets import BDay
+
+from helper import DATA_DIR, STORE_DIR, CSV_PREFIX, csv_path, load_csv, symbol_from_path
+from store import ColumnStore
+
+
+class Catalog:
+    """
+    Symbol-indexed catalog of scraped data kept in <data_dir>/catalog.json.
+
+    Each entry records where a symbol lives (columnar store or CSV), the
+    dates it covers, its row count and when it was last updated, so pages
+    can look any number of symbols up without re-scraping.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, store_dir=STORE_DIR):
+        self.data_dir = data_dir
+        self.index_path = os.path.join(data_dir, "catalog.json")
+        self.store = ColumnStore(store_dir)
+        self._lock = threading.Lock()
+        self._cached = (None, None)
+
+    def _read(self):
+        try:
+            with open(self.index_path) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, index):
+        tmp = "{}.{}.tmp".format(self.index_path, threading.get_ident())
+        with open(tmp, "w") as fp:
+            json.dump(index, fp, indent=2, sort_keys=True)
+        os.replace(tmp, self.index_path)
+
+    def _stamp(self):
+        stamp = []
+        for path in (self.index_path, self.data_dir, self.store.root):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def entries(self):
+        """
+        Returns the index, picking up store partitions and CSVs that were
+        written without being registered. The result is reused until the
+        index file or the data directories change.
+        """
+        stamp = self._stamp()
+        cached_stamp, cached = self._cached
+        if cached is not None and stamp == cached_stamp:
+            return cached
+        index = self._read()
+        missing = [s for s in self.store.symbols() if s not in index]
+        missing += [
+            symbol_from_path(f) for f in os.listdir(self.data_dir)
+            if f.startswith(CSV_PREFIX) and f.endswith(".csv") and symbol_from_path(f) not in index
+        ]
+        for symbol in dict.fromkeys(missing):
+            index = self.register(symbol)
+        self._cached = (self._stamp(), index)
+        return index
+
+    def symbols(self):
+        """
+        Symbols with at least one stored row
+        """
+        return sorted(s for s, entry in self.entries().items() if entry["rows"])
+
+    def get(self, symbol):
+        return self.entries().get(symbol)
+
+    def register(self, symbol, scraped=None):
+        """
+        Records (or refreshes) the location and coverage of a symbol.
+        `scraped` is the (start, end) range just asked of NSE, kept so days
+        without trading at its edges still count as covered. A scrape that
+        returned no rows leaves an empty store entry, so the range is not
+        asked for again.
+        """
+        if symbol in self.store.symbols():
+            location, kind = os.path.join(self.store.root, symbol), "store"
+            dates = self.store.read(symbol, columns=["DATE"])["DATE"]
+        elif os.path.exists(csv_path(symbol)):
+            location, kind = csv_path(symbol), "csv"
+            dates = load_csv(location, columns=["DATE"])["DATE"]
+        else:
+            location, kind = os.path.join(self.store.root, symbol), "store"
+            dates = pd.Series([], dtype="datetime64[ns]")
+        entry = {
+            "location": location,
+            "format": kind,
+            "first_date": dates.min().strftime("%Y-%m-%d") if len(dates) else None,
+            "last_date": dates.max().strftime("%Y-%m-%d") if len(dates) else None,
+            "rows": int(len(dates)),
+            "updated": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            index = self._read()
+            previous = index.get(symbol, {})
+            if scraped is not None:
+                # Only days that have closed, today may still get rows
+                start = _day(scraped[0])
+                end = min(_day(scraped[1]), _day(date.today() - timedelta(days=1)))
+                entry["scraped_from"] = min(filter(None, [previous.get("scraped_from"), start]))
+                entry["scraped_to"] = max(filter(None, [previous.get("scraped_to"), end]))
+            else:
+                for key in ("scraped_from", "scraped_to"):
+                    if key in previous:
+                        entry[key] = previous[key]
+            index[symbol] = entry
+            self._write(index)
+        return index
+
+    def covers(self, symbol, start, end=None):
+        """
+        True when the stored rows run from `start` (through `end` if given).
+        Weekends at either edge and the days of an earlier scrape that
+        returned no rows, such as holidays, count as covered.
+        """
+        entry = self.get(symbol)
+        if not entry:
+            return False
+        first = min(filter(None, [entry["first_date"], entry.get("scraped_from")]), default=None)
+        if first is None or first > _day(BDay().rollforward(pd.Timestamp(start))):
+            return False
+        if end is None:
+            return True
+        last = max(filter(None, [entry["last_date"], entry.get("scraped_to")]), default=None)
+        return last is not None and last >= _day(BDay().rollback(pd.Timestamp(end)))
+
+    def version(self, symbol):
+        """
+        Token that changes whenever the symbol's data on disk changes,
+        for use as a cache key
+        """
+        entry = self.get(symbol)
+        if entry is None:
+            return None
+        location = entry["location"]
+        if entry["format"] == "store":
+            paths = [os.path.join(location, str(y)) for y in self.store.years(symbol)]
+        else:
+            paths = [location]
+        return "{}:{}".format(location, max((os.path.getmtime(p) for p in paths), default=0))
+
+    def load(self, symbol, columns=None, start=None, end=None):
+        """
+        Returns the symbol's history sorted by DATE. Raises KeyError for unknown symbols.
+        """
+        entry = self.get(symbol)
+        if entry is None:
+            raise KeyError(f"{symbol} has not been scraped yet")
+        if entry["format"] == "store":
+            return self.store.read(symbol, columns=columns, start=start, end=end)
+        return load_csv(entry["location"], columns=columns, start=start, end=end)
+
+
+_catalog = None
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog()
+    return _catalog
+
+
+def _day(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
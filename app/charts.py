@@ -0,0 +1,175 @@
+"""
+Chart and table rendering for the Streamlit pages.
+
+Line charts never ship more points than the chart can draw. Each series is
+cut down to a few points per horizontal pixel with a shape-preserving
+downsampler (LTTB by default, or per-bucket min/max), and every trace is
+drawn with WebGL. Tables are paged, so only the visible rows are styled and
+sent to the browser. Render cost then depends on the chart width rather
+than on how much history is loaded.
+"""
+import math
+
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+# Width of Streamlit's default main column in CSS pixels
+CHART_WIDTH = 700
+TEXT_COLOR = "white"
+
+
+def _numeric(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def _fill(y):
+    """
+    NaNs take the series mean for point selection; the plotted values keep them
+    """
+    y = np.asarray(y, dtype=np.float64)
+    missing = np.isnan(y)
+    if missing.any():
+        y = np.where(missing, np.nanmean(y) if not missing.all() else 0.0, y)
+    return y
+
+
+def minmax_indices(y, n_out):
+    """
+    Indices of the lowest and highest point in each of n_out // 2 equal buckets,
+    plus both end points
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    y = _fill(y)
+    buckets = max(n_out // 2, 1)
+    size = math.ceil((n - 2) / buckets)
+    buckets = math.ceil((n - 2) / size)
+    pad = buckets * size - (n - 2)
+    inner = y[1:-1]
+    low = np.concatenate([inner, np.full(pad, np.inf)]).reshape(buckets, size).argmin(axis=1)
+    high = np.concatenate([inner, np.full(pad, -np.inf)]).reshape(buckets, size).argmax(axis=1)
+    start = 1 + np.arange(buckets) * size
+    return np.unique(np.concatenate([[0, n - 1], start + low, start + high]))
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: keeps the point of each bucket that forms
+    the largest triangle with the previous pick and the next bucket's mean
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = _numeric(x)
+    y = _fill(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        mean_x, mean_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[previous] - mean_x) * (y[lo:hi] - y[previous]) -
+                      (x[previous] - x[lo:hi]) * (mean_y - y[previous]))
+        previous = lo + int(area.argmax())
+        out[i + 1] = previous
+    return out
+
+
+def downsample_indices(x, columns, width=CHART_WIDTH, method="lttb"):
+    """
+    Row indices to plot for all `columns` (1-D arrays sharing x), the union of
+    each column's picks so no series loses its peaks
+    """
+    n_out = 2 * width
+    if len(x) <= n_out:
+        return np.arange(len(x))
+    picks = [lttb_indices(x, y, n_out) if method == "lttb" else minmax_indices(y, n_out) for y in columns]
+    return np.unique(np.concatenate(picks))
+
+
+def _layout(fig, title, xlabel, ylabel, background):
+    fig.update_layout(
+        title={"text": title, "x": 0.5, "xanchor": "center"},
+        xaxis_title=xlabel,
+        yaxis_title=ylabel,
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor=background,
+        font={"color": TEXT_COLOR},
+        legend={"x": 0, "y": 1, "bgcolor": "rgba(0,0,0,0.5)"},
+        margin={"l": 40, "r": 20, "t": 50, "b": 40},
+    )
+    return fig
+
+
+def line_figure(x, series, title="", xlabel="Date", ylabel="", width=CHART_WIDTH, method="lttb",
+                background="rgba(0,0,0,0)", mode="lines"):
+    """
+    WebGL line chart of `series` ({name: (y, color)} or {name: (y, color, dash)})
+    over a shared x, downsampled to `width` pixels
+    """
+    x = np.asarray(x)
+    values = {name: np.asarray(spec[0], dtype=np.float64) for name, spec in series.items()}
+    index = downsample_indices(x, list(values.values()), width, method)
+    fig = go.Figure()
+    for name, spec in series.items():
+        dash = spec[2] if len(spec) > 2 else None
+        fig.add_trace(go.Scattergl(x=x[index], y=values[name][index], name=name, mode=mode,
+                                   line={"color": spec[1], "dash": dash}, marker={"color": spec[1], "size": 4}))
+    return _layout(fig, title, xlabel, ylabel, background)
+
+
+def scatter_figure(x, y, color, title="", xlabel="", ylabel="", background="rgba(0,0,0,0)"):
+    """
+    WebGL scatter plot; every point is kept since the cloud has no order to preserve
+    """
+    fig = go.Figure(go.Scattergl(x=np.asarray(x), y=np.asarray(y), mode="markers",
+                                 marker={"color": color, "size": 4, "opacity": 0.7}))
+    return _layout(fig, title, xlabel, ylabel, background)
+
+
+def histogram_figure(values, color, bins=100, title="", xlabel="", ylabel="Frequency", background="rgba(0,0,0,0)"):
+    """
+    Bins on the server with np.histogram and ships only the bar heights
+    """
+    values = np.asarray(values, dtype=np.float64)
+    counts, edges = np.histogram(values[~np.isnan(values)], bins=bins)
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), marker={"color": color}))
+    return _layout(fig, title, xlabel, ylabel, background)
+
+
+def show(fig):
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def paginated_table(df, page_size=50, key="table", highlight=None):
+    """
+    Shows one page of `df` at a time. With `highlight` set to a colour, each
+    column's maximum over the whole frame is highlighted wherever it falls on
+    the current page.
+    """
+    pages = max(math.ceil(len(df) / page_size), 1)
+    left, right = st.columns([1, 3])
+    with left:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    with right:
+        st.write(f"Rows {(page - 1) * page_size + 1}-{min(page * page_size, len(df))} of {len(df)}")
+    view = df.iloc[(page - 1) * page_size:page * page_size]
+    if highlight is None:
+        st.dataframe(view)
+        return
+    numeric = df.select_dtypes("number")
+    maxima = numeric.max()
+
+    def mark(column):
+        if column.name not in maxima.index:
+            return [""] * len(column)
+        return [f"background-color: {highlight}" if v == maxima[column.name] else "" for v in column]
+
+    st.dataframe(view.style.apply(mark, axis=0))
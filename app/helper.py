@@ -1,40 +1,81 @@
 import os
-import shutil
+import sys
 
-def delete_files_except_one(folder_path, file_to_keep):
-    try:
-        # Ensure the folder path ends with a slash
-        if not folder_path.endswith(os.path.sep):
-            folder_path += os.path.sep
-        
-        # Get a list of all files in the folder
-        files = os.listdir(folder_path)
-        
-        # Iterate through all files
-        for file in files:
-            file_path = os.path.join(folder_path, file)
-            
-            # Check if the file is not the one you want to keep
-            if file != file_to_keep:
-                # Delete the file
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)  # Recursively delete directories
-            
-        print(f"All files except '{file_to_keep}' deleted successfully.")
-        
-    except Exception as e:
-        print(f"Error occurred: {e}")
+import pandas as pd
 
-def get_only_file_path(folder_path):
-    if not folder_path.endswith(os.path.sep):
-            folder_path += os.path.sep
-    # List all the files in the directory
-    files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-    
-    # Check if there is exactly one file
-    if len(files) == 1:
-        return os.path.join(folder_path, files[0])
-    else:
-        raise Exception("There is not exactly one file in the directory.")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prediction"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "analysis"))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+STORE_DIR = os.path.join(DATA_DIR, "store")
+CSV_PREFIX = "historical_stock_data_"
+
+# The stocks the app offers to scrape, by NSE symbol
+NIFTY_50 = {
+    "ADANIPORTS": "Adani Ports and Special Economic Zone Ltd",
+    "ASIANPAINT": "Asian Paints Ltd",
+    "AXISBANK": "Axis Bank Ltd",
+    "BAJAJ-AUTO": "Bajaj Auto Ltd",
+    "BAJFINANCE": "Bajaj Finance Ltd",
+    "BAJAJFINSV": "Bajaj Finserv Ltd",
+    "BPCL": "Bharat Petroleum Corporation Ltd",
+    "BHARTIARTL": "Bharti Airtel Ltd",
+    "BRITANNIA": "Britannia Industries Ltd",
+    "CIPLA": "Cipla Ltd",
+    "COALINDIA": "Coal India Ltd",
+    "DIVISLAB": "Divi's Laboratories Ltd",
+    "DRREDDY": "Dr. Reddy's Laboratories Ltd",
+    "EICHERMOT": "Eicher Motors Ltd",
+    "GRASIM": "Grasim Industries Ltd",
+    "HCLTECH": "HCL Technologies Ltd",
+    "HDFCBANK": "HDFC Bank Ltd",
+    "HDFC": "Housing Development Finance Corporation Ltd",
+    "HEROMOTOCO": "Hero MotoCorp Ltd",
+    "HINDALCO": "Hindalco Industries Ltd",
+    "HINDUNILVR": "Hindustan Unilever Ltd",
+    "ICICIBANK": "ICICI Bank Ltd",
+    "ITC": "ITC Ltd",
+    "INDUSINDBK": "IndusInd Bank Ltd",
+    "INFY": "Infosys Ltd",
+    "JSWSTEEL": "JSW Steel Ltd",
+    "KOTAKBANK": "Kotak Mahindra Bank Ltd",
+    "LT": "Larsen & Toubro Ltd",
+    "M&M": "Mahindra & Mahindra Ltd",
+    "MARUTI": "Maruti Suzuki India Ltd",
+    "NTPC": "NTPC Ltd",
+    "NESTLEIND": "Nestle India Ltd",
+    "ONGC": "Oil and Natural Gas Corporation Ltd",
+    "POWERGRID": "Power Grid Corporation of India Ltd",
+    "RELIANCE": "Reliance Industries Ltd",
+    "SBIN": "State Bank of India",
+    "SUNPHARMA": "Sun Pharmaceutical Industries Ltd",
+    "TCS": "Tata Consultancy Services Ltd",
+    "TATAMOTORS": "Tata Motors Ltd",
+    "TATASTEEL": "Tata Steel Ltd",
+    "TECHM": "Tech Mahindra Ltd",
+    "TITAN": "Titan Company Ltd",
+    "ULTRACEMCO": "UltraTech Cement Ltd",
+    "UPL": "UPL Ltd",
+    "WIPRO": "Wipro Ltd"
+}
+
+def csv_path(symbol):
+    return os.path.join(DATA_DIR, f"{CSV_PREFIX}{symbol}.csv")
+
+def symbol_from_path(file_path):
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return name.replace(CSV_PREFIX, "")
+
+def load_csv(file_path, columns=None, start=None, end=None):
+    """
+    Parses a scraped CSV into a frame sorted by DATE, trimmed to [start, end]
+    """
+    df = pd.read_csv(file_path, usecols=(["DATE"] + [c for c in columns if c != "DATE"]) if columns else None)
+    df['DATE'] = pd.to_datetime(df['DATE'])
+    df.sort_values(by='DATE', ascending=True, inplace=True)
+    if start is not None:
+        df = df[df['DATE'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['DATE'] <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
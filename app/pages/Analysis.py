@@ -2,12 +2,13 @@ import streamlit as st
 import os 
 import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 # Append the path to your main app for helper functions
 sys.path.append(os.path.abspath("../app.py"))
-from helper import get_only_file_path
+from catalog import get_catalog
+from indicators import IndicatorCache, PRESET_WINDOWS
+from technicals import load_panel, screen
+from charts import line_figure, scatter_figure, histogram_figure, show, paginated_table
 
 st.set_page_config(page_title="Analysis", page_icon="🐍")
 
@@ -61,14 +62,26 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Function to get the path of the only file in the directory
-directory_path = os.path.join('..', 'data')
-file_path = get_only_file_path(directory_path)
-
-# Read the stock data
-stock = pd.read_csv(file_path)
-stock['DATE'] = pd.to_datetime(stock['DATE'])
-stock.set_index('DATE', inplace=True)
+# Look the stock up in the catalog, defaulting to the one scraped last
+catalog = get_catalog()
+symbols = catalog.symbols()
+if not symbols:
+    st.warning("No stock data yet. Scrape a stock on the home page first.")
+    st.stop()
+default_symbol = st.session_state.get("symbol")
+symbol = st.selectbox("Stock", symbols, index=symbols.index(default_symbol) if default_symbol in symbols else 0)
+st.session_state["symbol"] = symbol
+
+# Loaded frames and derived series are memoized per data version, so a
+# dropdown change only re-plots
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_stock(symbol, version):
+    stock = get_catalog().load(symbol)
+    stock.set_index('DATE', inplace=True)
+    return stock
+
+version = catalog.version(symbol)
+stock = load_stock(symbol, version)
 
 # Dictionary for dropdown options
 options_dict = {
@@ -80,18 +93,8 @@ options_dict = {
 
 # Function to plot the selected metric
 def plot_stock_metric(df, metric, color):
-    fig, ax = plt.subplots(figsize=(12, 4))
-    df[metric].plot(ax=ax, color=color)
-    ax.set_xlabel("Date", color='white')
-    ax.set_ylabel(metric.capitalize(), color='white')
-    ax.set_title(f"Stock {metric.capitalize()} Over Time", color='white')
-    ax.tick_params(axis='x', colors='white')
-    ax.tick_params(axis='y', colors='white')
-    ax.spines['bottom'].set_color('white')
-    ax.spines['left'].set_color('white')
-    fig.patch.set_alpha(0)
-    ax.patch.set_alpha(0)
-    st.pyplot(fig)
+    show(line_figure(df.index, {metric: (df[metric], color)}, title=f"Stock {metric.capitalize()} Over Time",
+                     ylabel=metric.capitalize()))
 
 # Layout and interaction in Streamlit
 st.markdown('<h1 class="center fadeIn header">Enhancing Your Stock Market Insights</h1>', unsafe_allow_html=True)
@@ -117,18 +120,8 @@ plot_stock_metric(stock, selected_metric, selected_color)
 
 # Function to plot the selected metrics
 def versusGraph(df, x_metric, y_metric, color):
-    fig, ax = plt.subplots(figsize=(12, 4))
-    ax.scatter(df[x_metric], df[y_metric], color=color)
-    ax.set_xlabel(x_metric.capitalize(), color='white')
-    ax.set_ylabel(y_metric.capitalize(), color='white')
-    ax.set_title(f"{x_metric.capitalize()} vs {y_metric.capitalize()}", color='white')
-    ax.tick_params(axis='x', colors='white')
-    ax.tick_params(axis='y', colors='white')
-    ax.spines['bottom'].set_color('white')
-    ax.spines['left'].set_color('white')
-    fig.patch.set_alpha(0)
-    ax.patch.set_alpha(0)
-    st.pyplot(fig)
+    show(scatter_figure(df[x_metric], df[y_metric], color, title=f"{x_metric.capitalize()} vs {y_metric.capitalize()}",
+                        xlabel=x_metric.capitalize(), ylabel=y_metric.capitalize()))
 
 st.markdown('<h2 class="center fadeIn header">Set Your Matrices Straight</h2>', unsafe_allow_html=True)
 
@@ -162,24 +155,28 @@ with right:
 # Call the plotting function with the selected metrics and color
 versusGraph(stock, x_metric, y_metric, selected_color)
 
-# Function to calculate SMA
-def calculate_SMA(df, column):
-    sma_df = df[column].to_frame()
-    sma_df['SMA30'] = df[column].rolling(30).mean()
-    sma_df.dropna(inplace=True)
-    return sma_df
-
-def calculate_CMA(df, column):
-    cma_df = df[column].to_frame()
-    cma_df['CMA30'] = df[column].expanding().mean()
-    cma_df.dropna(inplace=True)
-    return cma_df
-
-def calculate_EMA(df, column):
-    ema_df = df[column].to_frame()
-    ema_df['EMA30'] = df[column].ewm(span=30).mean()
-    ema_df.dropna(inplace=True)
-    return ema_df
+# Indicator state lives for the whole server process, one per series. A
+# refresh only feeds the new rows through it and a new window is computed
+# once, so changing the selection below costs nothing after the first time
+@st.cache_resource(max_entries=64, show_spinner=False)
+def indicator_cache(symbol, column):
+    return IndicatorCache()
+
+def moving_average(symbol, version, column, indicator, windows):
+    cache = indicator_cache(symbol, column)
+    with cache.lock:
+        cache.extend(load_stock(symbol, version)[column])
+        if indicator == 'CMA':
+            cache.request(cma=True)
+            names = ['CMA']
+        else:
+            cache.request(**{indicator.lower(): windows})
+            names = [f'{indicator}{w}' for w in windows]
+        return cache.series.to_frame().join(cache.get(names))
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def weekly_returns(symbol, version):
+    return load_stock(symbol, version)['PREV. CLOSE'].pct_change()
 
 moving_averages = {
     "SMA": ("Simple Moving Average", "A SMA tells us the unweighted mean of the previous K data points. The more the value of K, the smoother the curve, but increasing K decreases accuracy. If the data points are p1, p2, . . . , pn, then we calculate the simple moving average."),
@@ -200,37 +197,62 @@ with right:
 if selected_ma_type:
     st.markdown(f"**{moving_averages[selected_ma_type][0]}**: {moving_averages[selected_ma_type][1]}")
 
+# Pick any number of windows, presets or custom
+windows = []
+if selected_ma_type in ('SMA', 'EMA'):
+    left, right = st.columns(2)
+    with left:
+        windows = st.multiselect('Windows (days):', PRESET_WINDOWS)
+    with right:
+        custom = st.number_input('Custom window (days, 0 for none):', min_value=0, max_value=max(len(stock), 1), value=min(30, len(stock)), step=1)
+    windows = sorted(set(windows) | ({int(custom)} if custom else set()))
+
 # Calculate selected moving average
 ma_df = None
-if selected_ma_type == 'SMA':
-    ma_df = calculate_SMA(stock, selected_metric)
-elif selected_ma_type == 'CMA':
-    ma_df = calculate_CMA(stock, selected_metric)
-elif selected_ma_type == 'EMA':
-    ma_df = calculate_EMA(stock, selected_metric)
+if selected_ma_type == 'CMA' or windows:
+    ma_df = moving_average(symbol, version, selected_metric, selected_ma_type, tuple(windows))
 
 # Plotting the Moving Averages
 if ma_df is not None:
     st.markdown(f'#### {moving_averages[selected_ma_type][0]} for {selected_metric}')
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(ma_df.index, ma_df[selected_metric], label=selected_metric, color='#3DC2EC')
-    ax.plot(ma_df.index, ma_df[f'{selected_ma_type}30'], label=f'{moving_averages[selected_ma_type][0]} (30 days)', color='#FF204E')
-    ax.set_xlabel('Date', color='white')
-    ax.set_ylabel(selected_metric, color='white')
-    ax.spines['bottom'].set_color('white')
-    ax.spines['left'].set_color('white')
-    ax.tick_params(axis='x', colors='white')
-    ax.tick_params(axis='y', colors='white')
-    legend = ax.legend(facecolor='black', edgecolor='white', loc='upper left')
-    for text in legend.get_texts():
-        text.set_color('white')
-    fig.patch.set_alpha(0)
-    ax.patch.set_alpha(0)
-    st.pyplot(fig)
+    colors = ['#FF204E', '#FFD700', '#9CDBA6', '#FFC7ED', '#DEF9C4', '#FF6969']
+    labels = {'CMA': moving_averages['CMA'][0]}
+    labels.update({f'{selected_ma_type}{w}': f'{moving_averages[selected_ma_type][0]} ({w} days)' for w in windows})
+    series = {selected_metric: (ma_df[selected_metric], '#3DC2EC')}
+    for i, column in enumerate(ma_df.columns[1:]):
+        series[labels[column]] = (ma_df[column], colors[i % len(colors)])
+    show(line_figure(ma_df.index, series, ylabel=selected_metric))
 else:
     st.write("Select valid options to generate the plot.")
 
-stock['Weekly Return'] = stock['PREV. CLOSE'].pct_change()
+# Latest technicals for every scraped stock, computed on one aligned panel
+@st.cache_data(max_entries=4, show_spinner=False)
+def index_screen(versions):
+    panel = load_panel(get_catalog(), [s for s, _ in versions])
+    latest = {name: panel.latest(values) for name, values in screen(panel).items()}
+    table = pd.DataFrame({
+        'Close': panel.latest(panel['CLOSE']),
+        'RSI (14)': latest['RSI14'],
+        'MACD histogram': latest['MACD_HIST'],
+        'Bollinger %B': (panel.latest(panel['CLOSE']) - latest['BB_LOWER']) / (latest['BB_UPPER'] - latest['BB_LOWER']),
+        'ATR (14)': latest['ATR14'],
+        'VWAP (20)': latest['VWAP20'],
+        'Volatility (20d, ann.)': latest['VOLATILITY20'],
+    })
+    table.index.name = 'SYMBOL'
+    return table
+
+st.markdown('<h2 class="center fadeIn header">Index Screen</h2>', unsafe_allow_html=True)
+
+st.markdown("""
+### Technical Indicators Across Every Scraped Stock
+
+RSI, MACD, Bollinger bands, ATR, rolling VWAP and volatility as of each stock's latest session.
+""")
+
+paginated_table(index_screen(tuple((s, catalog.version(s)) for s in symbols)).round(2), key='index_screen')
+
+stock['Weekly Return'] = weekly_returns(symbol, version)
 
 # Display plot in Streamlit
 st.markdown('<h2 class="center fadeIn header">Weekly Returns</h2>', unsafe_allow_html=True)
@@ -242,36 +264,14 @@ Understand how **Weekly Returns** reflect market movements and investment perfor
 """)
 
 def plot_weekly_returns_line():
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(stock.index, stock['Weekly Return'], linestyle='--', marker='o', color='#3DC2EC', label='Weekly Return')
-    ax.set_xlabel('Date', color='white')
-    ax.set_ylabel('Weekly Return', color='white')
-    ax.set_title('Weekly Returns Line Plot', color='white')
-    ax.tick_params(axis='x', colors='white')
-    ax.tick_params(axis='y', colors='white')
-    ax.spines['bottom'].set_color('white')
-    ax.spines['left'].set_color('white')
-    legend = ax.legend(facecolor='black', edgecolor='white', loc='upper left')
-    for text in legend.get_texts():
-        text.set_color('white')
-    fig.patch.set_alpha(0)
-    ax.patch.set_alpha(0)
-    st.pyplot(fig)
+    # Min/max buckets keep every spike in the noisy return series
+    show(line_figure(stock.index, {'Weekly Return': (stock['Weekly Return'], '#3DC2EC', 'dash')},
+                     title='Weekly Returns Line Plot', ylabel='Weekly Return', method='minmax', mode='lines+markers'))
 
 # Function to plot the histogram for Weekly Returns
 def plot_weekly_returns_histogram():
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(stock['Weekly Return'].dropna(), bins=100, color='red', ax=ax)
-    ax.set_xlabel('Weekly Return', color='white')
-    ax.set_ylabel('Frequency', color='white')
-    ax.set_title('Distribution of Weekly Returns', color='white')
-    ax.tick_params(axis='x', colors='white')
-    ax.tick_params(axis='y', colors='white')
-    ax.spines['bottom'].set_color('white')
-    ax.spines['left'].set_color('white')
-    fig.patch.set_alpha(0)
-    ax.patch.set_alpha(0)
-    st.pyplot(fig)
+    show(histogram_figure(stock['Weekly Return'], 'red', bins=100, title='Distribution of Weekly Returns',
+                          xlabel='Weekly Return'))
 
 # Option to select plot type
 plot_type = st.selectbox("Select plot type:", ("Weekly Return line plot", "Histogram of Average weekly Return"))
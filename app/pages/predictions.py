@@ -1,20 +1,20 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-from keras.models import load_model
-import pickle
 import os
 import sys
-import plotly.express as px
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_absolute_percentage_error
-from statsmodels.tsa.arima.model import ARIMA
-from pmdarima import auto_arima
 
 # Add path to the helper module
 sys.path.append(os.path.abspath("../app.py"))
-from helper import get_only_file_path
+from catalog import get_catalog
+from forecast import rollout
+from windowing import make_windows, last_window
+import registry
+import arima
+from arima import walk_forward
+from backtest import backtest, summary
+import service
+from charts import line_figure, show
 
 # Set page configuration and custom styling
 st.set_page_config(page_title="Prediction", page_icon="🐍")
@@ -101,35 +101,20 @@ def display_model_selection(ml_model):
     return None, None
 
 
-def common_prediction(stockData, model_path, model_type, scaler, window_size=60, prediction_days=30):
+def common_prediction(stockData, model, scaler, window_size=60, prediction_days=30):
+    """
+    Test fit and forecast for the LSTM/GRU models; ARIMA has its own page section, ARIMA()
+    """
+    from sklearn.metrics import mean_absolute_percentage_error
+
     test_size = stockData[stockData.DATE.dt.year == 2023].shape[0]
 
     test_data = stockData.CLOSE[-test_size - window_size:]
     test_data = scaler.transform(test_data.values.reshape(-1, 1))
 
-    X_test = []
-    y_test = []
-
-    for i in range(window_size, len(test_data)):
-        X_test.append(test_data[i - window_size:i, 0])
-        y_test.append(test_data[i, 0])
-
-    X_test = np.array(X_test)
-    y_test = np.array(y_test)
-    X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
-    y_test = np.reshape(y_test, (-1, 1))
+    X_test, y_test = make_windows(test_data, window_size)
 
-    if model_type in ['LSTM', 'GRU']:
-        path = os.path.abspath(model_path)
-
-        model = load_model(path)
-        result = model.evaluate(X_test, y_test)
-        y_pred = model.predict(X_test)
-    elif model_type == 'ARIMA':
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
-        y_pred = model.forecast(steps=len(y_test))[0]
-        y_pred = y_pred.reshape(-1, 1)
+    y_pred = model.predict(X_test)
 
     MAPE = mean_absolute_percentage_error(y_test, y_pred)
     Accuracy = 1 - MAPE
@@ -140,31 +125,16 @@ def common_prediction(stockData, model_path, model_type, scaler, window_size=60,
     y_test_true = scaler.inverse_transform(y_test)
     y_test_pred = scaler.inverse_transform(y_pred)
 
-    plt.figure(figsize=(15, 6), dpi=150)
-    plt.rcParams['axes.facecolor'] = 'orange'
-    plt.rc('axes', edgecolor='white')
-
-    plt.plot(stockData['DATE'].iloc[-len(y_test_true):], y_test_true, color='blue', lw=2)
-    plt.plot(stockData['DATE'].iloc[-len(y_test_true):], y_test_pred, color='red', lw=2)
-    plt.title(f'Model Performance on {stockData["SYMBOL"].iloc[0]} Stock Price Prediction', fontsize=15)
-    plt.xlabel('Date', fontsize=12)
-    plt.ylabel('Price', fontsize=12)
-    plt.legend(['Actual Test Data', 'Predicted Test Data'], loc='upper left', prop={'size': 15})
-    plt.grid(color='white')
-    st.pyplot(plt)
-
-    last_sequence = X_test[-1:] if model_type in ['LSTM', 'GRU'] else stockData.CLOSE[-window_size:].values.reshape(-1, 1)
-    future_predictions = []
-
-    for _ in range(prediction_days):
-        if model_type in ['LSTM', 'GRU']:
-            next_pred = model.predict(last_sequence)
-            future_predictions.append(next_pred)
-            last_sequence = np.append(last_sequence[:, 1:, :], next_pred[:, np.newaxis, :], axis=1)
-        elif model_type == 'ARIMA':
-            next_pred = model.forecast(steps=1)[0]
-            future_predictions.append(next_pred)
-            last_sequence = np.append(last_sequence[1:], next_pred.reshape(-1, 1), axis=0)
+    test_dates = stockData['DATE'].iloc[-len(y_test_true):].to_numpy()
+    test_series = {
+        'Actual Test Data': (y_test_true.ravel(), 'blue'),
+        'Predicted Test Data': (y_test_pred.ravel(), 'red'),
+    }
+    show(line_figure(test_dates, test_series, title=f'Model Performance on {stockData["SYMBOL"].iloc[0]} Stock Price Prediction',
+                     ylabel='Price', background='orange'))
+
+    # Roll forward from the last full window, including the latest close
+    future_predictions = rollout(model, last_window(test_data, window_size), prediction_days)
 
     future_predictions = scaler.inverse_transform(np.array(future_predictions).reshape(-1, 1))
 
@@ -178,56 +148,38 @@ def common_prediction(stockData, model_path, model_type, scaler, window_size=60,
 
     st.write(f"Closing Price for next {prediction_days} days", future_predictions_df)
 
-    plt.figure(figsize=(15, 6), dpi=150)
-    plt.rcParams['axes.facecolor'] = 'orange'
-    plt.rc('axes', edgecolor='white')
+    # Future points extend the test series so both share one downsampled x axis
+    dates = np.concatenate([test_dates, np.array(future_dates, dtype='datetime64[ns]')])
+    pad = np.full(prediction_days, np.nan)
+    series = {name: (np.concatenate([y, pad]), color) for name, (y, color) in test_series.items()}
+    series['Future Predictions'] = (np.concatenate([np.full(len(test_dates), np.nan), future_predictions.ravel()]), 'green', 'dash')
+    show(line_figure(dates, series, title=f'Model Performance and Future Predictions on {stockData["SYMBOL"].iloc[0]} Stock Price',
+                     ylabel='Price', background='orange'))
 
-    plt.plot(stockData['DATE'].iloc[-len(y_test_true):], y_test_true, color='blue', lw=2)
-    plt.plot(stockData['DATE'].iloc[-len(y_test_true):], y_test_pred, color='red', lw=2)
-    plt.plot(future_dates, future_predictions, color='green', lw=2, linestyle='dashed')
-    plt.title(f'Model Performance and Future Predictions on {stockData["SYMBOL"].iloc[0]} Stock Price', fontsize=15)
-    plt.xlabel('Date', fontsize=12)
-    plt.ylabel('Price', fontsize=12)
-    plt.legend(['Actual Test Data', 'Predicted Test Data', 'Future Predictions'], loc='upper left', prop={'size': 15})
-    plt.grid(color='white')
-    st.pyplot(plt)
 
+def ARIMA(stockData, model, test_days=100, prediction_days=30):
+    from sklearn.metrics import mean_absolute_percentage_error
 
-def ARIMA(stockData):
     df2 = stockData.set_index('DATE')
-    data = list(df2["CLOSE"])
-    x_train = data[:-100]
-    x_test = data[-100:]
-
-    # Load the ARIMA model from pickle file
-    pickle_file_path = "../models/ARIMA/HDFC_ARIMA.pkl"  # Adjust this path
-    with open(pickle_file_path, 'rb') as f:
-        model = pickle.load(f)
+    closes = df2['CLOSE'].to_numpy(dtype=np.float64)
+    start = len(closes) - test_days
 
-    # Make predictions
-    start = len(x_train)
-    end = len(x_train) + len(x_test) - 1
-    pred = model.predict(start=start, end=end)
+    # Walk forward over the test days: each forecast only sees earlier closes
+    # and each close is added with a filter update instead of a refit
+    pred, latest = walk_forward(model, closes, start)
 
     # Prepare the predicted series
-    s = pd.Series(pred, index=df2.index[-100:])
+    s = pd.Series(pred, index=df2.index[start:])
 
     # Plot actual vs predicted
-    plt.figure(figsize=(10, 6), dpi=100)
-    df2['CLOSE'][-100:].plot(label='Actual Stock Price', legend=True)
-    s.plot(label='Predicted Price', legend=True)
-    plt.title(f'Model Performance on {stockData["SYMBOL"].iloc[0]} Stock Price Prediction (ARIMA)', fontsize=15)
-    plt.xlabel('Date', fontsize=12)
-    plt.ylabel('Price', fontsize=12)
-    plt.legend(prop={'size': 15})
-    plt.grid(color='white')
-
-    # Display the plot in Streamlit
-    st.pyplot(plt)
+    show(line_figure(df2.index[start:], {
+        'Actual Stock Price': (df2['CLOSE'][start:], '#3DC2EC'),
+        'Predicted Price': (s, '#FF204E'),
+    }, title=f'Model Performance on {stockData["SYMBOL"].iloc[0]} Stock Price Prediction (ARIMA)', ylabel='Price'))
 
     # Calculate metrics (MAPE and Accuracy)
-    y_test = df2['CLOSE'][-100:].values  # Ensure y_test is 1-dimensional
-    y_test_pred = s.values  # Ensure y_test_pred is 1-dimensional
+    y_test = closes[start:]
+    y_test_pred = s.values
     MAPE = mean_absolute_percentage_error(y_test, y_test_pred)
     Accuracy = 1 - MAPE
 
@@ -235,17 +187,40 @@ def ARIMA(stockData):
     st.write("Test MAPE:", MAPE)
     st.write("Test Accuracy:", Accuracy)
 
-    pred_future = model.predict(start=end, end=end + 10)
+    last_date = df2.index[-1]
+    future_predictions_df = pd.DataFrame({
+        'Date': [last_date + pd.Timedelta(days=i) for i in range(1, prediction_days + 1)],
+        'Predicted Price': np.asarray(latest.forecast(prediction_days)),
+    })
+    st.write(f"Closing Price for next {prediction_days} days", future_predictions_df)
+
+
+@st.cache_resource(max_entries=8, show_spinner="Fitting ARIMA...")
+def fit_arima(symbol, version, train_rows, order=(5, 2, 0), start_params=None):
+    """
+    Estimates `order` on the rows before the test window only, so the
+    walk-forward never scores a model that has seen the test days. Starts
+    from `start_params` (a cached model's) when given. Returns None when
+    the fit fails.
+    """
+    closes = get_catalog().load(symbol, columns=['CLOSE'])['CLOSE'].to_numpy(dtype=np.float64)[:train_rows]
+    fitted = arima.fit(closes, order, None if start_params is None else np.asarray(start_params))
+    if fitted is None:
+        return None
+    return arima.build(closes, fitted['order'], fitted['params'])
 
 
 def main():
     # Load data
-    directory_path = '../data'
-    file_path = get_only_file_path(directory_path)
-    stockData = pd.read_csv(file_path)
-    stockData['DATE'] = pd.to_datetime(stockData['DATE'])
-    stockData.sort_values(by='DATE', ascending=True, inplace=True)
-    stockData.reset_index(drop=True, inplace=True)
+    catalog = get_catalog()
+    symbols = catalog.symbols()
+    if not symbols:
+        st.warning("No stock data yet. Scrape a stock on the home page first.")
+        return
+    default_symbol = st.session_state.get("symbol")
+    symbol = st.selectbox("Stock", symbols, index=symbols.index(default_symbol) if default_symbol in symbols else 0)
+    st.session_state["symbol"] = symbol
+    stockData = catalog.load(symbol)
 
     # Display introductory content
     st.markdown('<h1 class="stTitle">Stock Market Forecasting Insights</h1>', unsafe_allow_html=True)
@@ -257,15 +232,8 @@ def main():
     """)
 
     # Display historical price plot
-    fig = px.line(stockData, x='DATE', y='CLOSE')
-    fig.update_traces(line_color='black')
-    fig.update_layout(
-        xaxis_title="Date",
-        yaxis_title="Scaled Price",
-        title={'text': f"{stockData['SYMBOL'].iloc[0]} Price History Data", 'y': 0.95, 'x': 0.5, 'xanchor': 'center', 'yanchor': 'top'},
-        plot_bgcolor='rgba(255,223,0,0.8)'
-    )
-    st.plotly_chart(fig)
+    show(line_figure(stockData['DATE'], {'CLOSE': (stockData['CLOSE'], 'black')}, title=f"{stockData['SYMBOL'].iloc[0]} Price History Data",
+                     ylabel="Scaled Price", background='rgba(255,223,0,0.8)'))
 
     # Model selection and prediction
     ml_model = {
@@ -273,23 +241,71 @@ def main():
         "GRU": "Gated Recurrent Unit",
         "ARIMA": "AutoRegressive Integrated Moving Average"
     }
+    test_days = st.slider("ARIMA walk-forward test days", min_value=20, max_value=max(len(stockData) - 100, 21), value=min(100, max(len(stockData) - 100, 21)))
     selected_model_key, selected_model_name = display_model_selection(ml_model)
 
-    # Define model paths
-    model_paths = {
-        "LSTM": "../models/LSTM/StockPredictionModel_AXIS.keras",
-        "GRU": "../models/GRU/AXIS_Model_GRU.keras",
-        "ARIMA": "../models/ARIMA/arima.pkl"
-    }
+    # Same folds for every model, so these scores are comparable
+    if st.checkbox("Walk-forward comparison of all models"):
+        folds = st.slider("Folds", min_value=2, max_value=10, value=5)
+        # ARIMA is always re-estimated per fold. Retraining the networks per
+        # fold is slow, so by default the registered ones are scored and
+        # labelled in-sample, since they were trained on the test days too
+        retrain = st.checkbox("Retrain LSTM/GRU on each fold (slow)")
+        in_sample = () if retrain else ("LSTM", "GRU")
+        try:
+            with st.spinner("Backtesting..."):
+                scores = backtest({symbol: stockData['CLOSE'].to_numpy()}, folds=folds, test_size=60, in_sample=in_sample,
+                                  workers=0)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.dataframe(summary(scores).loc[symbol].round(4))
+
+    # ARIMA models are fitted per symbol by prediction/arima.py
+    if selected_model_key == "ARIMA":
+        entry = arima.cached_entry(symbol)
+        train_rows = len(stockData) - test_days
+        if entry:
+            # The cached fit has seen the test days, so only its order and
+            # starting parameters are reused
+            order = tuple(entry["order"])
+            model = fit_arima(symbol, catalog.version(symbol), train_rows, order, tuple(entry["params"]))
+        else:
+            order = (5, 2, 0)
+            st.info(f"No ARIMA model has been fitted for {symbol} yet, fitting ARIMA(5, 2, 0) on the rows before the test window. "
+                    "Run prediction/arima.py to search for and cache one.")
+            model = fit_arima(symbol, catalog.version(symbol), train_rows)
+        if model is None:
+            st.error(f"Could not fit ARIMA{order} on the {train_rows} rows before the test window. Try fewer test days.")
+            return
+        ARIMA(stockData, model, test_days)
+        return
 
     # Perform predictions based on selected model
     if selected_model_key:
+        try:
+            entry = registry.registry.resolve(symbol, selected_model_key)
+        except KeyError as e:
+            st.error(str(e.args[0]))
+            return
+        # Models stay resident in prediction/service.py when it is running,
+        # which batches concurrent sessions into shared forward passes
+        if service.available():
+            model = service.RemoteModel(symbol, selected_model_key, entry["version"])
+        else:
+            model = registry.cache.get(entry["path"])
+        if entry["generic"]:
+            trained_on = f", which was trained on {entry['trained_on']} prices" if entry.get("trained_on") else ""
+            st.info(f"No {selected_model_key} model has been trained for {symbol} yet, using the generic one{trained_on}.")
+
         if selected_model_key in ["LSTM", "GRU"]:
-            scaler = MinMaxScaler()
-            scaler.fit(stockData.CLOSE.values.reshape(-1, 1))
-            common_prediction(stockData, model_paths[selected_model_key], selected_model_key, scaler)
-        elif selected_model_key == "ARIMA":
-            ARIMA(stockData)
+            # Models from prediction/train.py ship the scaler they were trained with
+            scaler = registry.load_scaler(entry)
+            if scaler is None:
+                from sklearn.preprocessing import MinMaxScaler
+                scaler = MinMaxScaler()
+                scaler.fit(stockData.CLOSE.values.reshape(-1, 1))
+            common_prediction(stockData, model, scaler, window_size=entry.get("window", 60))
 
 
 if __name__ == '__main__':
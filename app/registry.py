@@ -0,0 +1,236 @@
+import os
+import json
+import pickle
+import threading
+from collections import OrderedDict
+
+from helper import NIFTY_50
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models")
+
+# Symbol used for entries that apply to any stock without its own model
+GENERIC = "*"
+
+
+class ModelRegistry:
+    """
+    Maps (symbol, model type, version) to an artifact under models/, as listed
+    in models/registry.json. Symbols without their own model fall back to
+    the generic entry for that model type.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR):
+        self.models_dir = models_dir
+        self.manifest_path = os.path.join(models_dir, "registry.json")
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.manifest_path) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {"aliases": {}, "models": []}
+
+    def entries(self, model_type=None):
+        return [m for m in self._read()["models"] if model_type is None or m["type"] == model_type]
+
+    def resolve(self, symbol, model_type, version=None):
+        """
+        Returns the manifest entry for the symbol's model, latest version by
+        default, with `path` made absolute and `generic` set when the fallback
+        model was picked. Raises KeyError when nothing matches.
+        """
+        manifest = self._read()
+        name = self.canonical(symbol, manifest)
+        for candidate in (name, GENERIC):
+            matches = [
+                m for m in manifest["models"]
+                if m["symbol"] == candidate and m["type"] == model_type
+                and (version is None or m["version"] == version)
+            ]
+            if matches:
+                entry = dict(max(matches, key=lambda m: m["version"]))
+                entry["path"] = os.path.join(self.models_dir, entry["path"])
+                entry["generic"] = candidate == GENERIC
+                return entry
+        raise KeyError(f"No {model_type} model registered for {symbol}")
+
+    def canonical(self, symbol, manifest=None):
+        """
+        The name models for `symbol` are registered under, after aliases.
+        Aliases onto another listed stock are ignored, since they would hand
+        one company's models to a different company.
+        """
+        manifest = manifest or self._read()
+        target = manifest.get("aliases", {}).get(symbol, symbol)
+        if target != symbol and target in NIFTY_50:
+            return symbol
+        return target
+
+    def next_version(self, symbol, model_type):
+        existing = [m["version"] for m in self.entries(model_type) if m["symbol"] == symbol]
+        return max(existing, default=0) + 1
+
+    def register(self, symbol, model_type, path, version=None, **extra):
+        """
+        Adds an artifact to the manifest and returns its entry. Without an
+        explicit version the next one for (symbol, model_type) is used.
+        """
+        with self._lock:
+            manifest = self._read()
+            existing = [m["version"] for m in manifest["models"] if m["symbol"] == symbol and m["type"] == model_type]
+            if version is None:
+                version = max(existing, default=0) + 1
+            entry = dict(extra, symbol=symbol, type=model_type, version=version,
+                         path=os.path.relpath(path, self.models_dir))
+            manifest["models"] = [
+                m for m in manifest["models"]
+                if not (m["symbol"] == symbol and m["type"] == model_type and m["version"] == version)
+            ] + [entry]
+            tmp = "{}.{}.tmp".format(self.manifest_path, threading.get_ident())
+            with open(tmp, "w") as fp:
+                json.dump(manifest, fp, indent=2)
+            os.replace(tmp, self.manifest_path)
+        return entry
+
+
+def _stamp(path):
+    """
+    What invalidates a cached artifact: the file's stat, plus that of the
+    .npz export next to a .keras file
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if path.endswith(".keras"):
+        try:
+            stat = os.stat(os.path.splitext(path)[0] + ".npz")
+            stamp += (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+    return stamp
+
+
+def _load_artifact(path):
+    """
+    Returns (model, path of the file it was loaded from)
+    """
+    if path.endswith(".keras"):
+        from numpy_runtime import exported_path, load
+        # The NumPy export runs without importing TensorFlow
+        exported = exported_path(path)
+        if exported:
+            return load(exported), exported
+        from keras.models import load_model
+        # Inference only: skip restoring the optimizer
+        return load_model(path, compile=False), path
+    with open(path, "rb") as f:
+        return pickle.load(f), path
+
+
+class ModelCache:
+    """
+    Process-wide LRU cache of loaded models. Artifact size on disk is used as
+    the memory estimate; least recently used models are dropped once the
+    total goes over max_bytes. An artifact rewritten in place (e.g. a daily
+    ARIMA update), or a .keras model whose .npz export was added or
+    replaced, is reloaded on its next use.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def _cached(self, path, stamp):
+        if path in self._models and self._models[path][2] == stamp:
+            self._models.move_to_end(path)
+            return self._models[path]
+        return None
+
+    def get(self, path):
+        stamp = _stamp(path)
+        with self._lock:
+            hit = self._cached(path, stamp)
+            if hit:
+                return hit[0]
+            # One lock per artifact so concurrent sessions load it only once
+            key_lock = self._loading.setdefault(path, threading.Lock())
+        with key_lock:
+            with self._lock:
+                hit = self._cached(path, stamp)
+                if hit:
+                    return hit[0]
+            model, loaded_from = _load_artifact(path)
+            with self._lock:
+                self._models[path] = (model, os.path.getsize(loaded_from), stamp)
+                self._models.move_to_end(path)
+                self._evict()
+                self._loading.pop(path, None)
+        return model
+
+    def _evict(self):
+        total = sum(size for _, size, _ in self._models.values())
+        while total > self.max_bytes and len(self._models) > 1:
+            _, (_, size, _) = self._models.popitem(last=False)
+            total -= size
+
+    def loaded(self):
+        with self._lock:
+            return list(self._models)
+
+
+registry = ModelRegistry()
+cache = ModelCache()
+
+
+def load(symbol, model_type, version=None):
+    """
+    Returns (model, entry) for the symbol, loading the artifact on first use
+    """
+    entry = registry.resolve(symbol, model_type, version)
+    return cache.get(entry["path"]), entry
+
+
+def load_scaler(entry):
+    """
+    The scaler fitted alongside the entry's model, or None for models
+    registered without one
+    """
+    if not entry.get("scaler"):
+        return None
+    return cache.get(os.path.join(registry.models_dir, entry["scaler"]))
+
+
+def preload(symbols=None, model_types=("LSTM", "GRU", "ARIMA")):
+    """
+    Warms the cache with the models for `symbols` (every registered model when None)
+    """
+    if symbols is None:
+        paths = {os.path.join(registry.models_dir, m["path"]) for m in registry.entries() if m["type"] in model_types}
+    else:
+        paths = set()
+        for symbol in symbols:
+            for model_type in model_types:
+                try:
+                    paths.add(registry.resolve(symbol, model_type)["path"])
+                except KeyError:
+                    pass
+    for path in sorted(paths):
+        cache.get(path)
+
+
+_preload_thread = None
+_preload_lock = threading.Lock()
+
+
+def preload_in_background(symbols=None, model_types=("LSTM", "GRU", "ARIMA")):
+    """
+    Starts preload() on a daemon thread, once per process
+    """
+    global _preload_thread
+    with _preload_lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(target=preload, args=(symbols, model_types), daemon=True)
+            _preload_thread.start()
+    return _preload_thread
@@ -0,0 +1,102 @@
+"""
+Compares per-symbol pandas indicators with the vectorized panel versions.
+
+    python benchmarks/bench_indicators.py --symbols 45 --years 10
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "analysis"))
+
+import numpy as np
+import pandas as pd
+from technicals import panel_from_frames, screen
+
+
+def fake_frames(symbols, years, seed=0):
+    """
+    Random-walk OHLCV/VWAP histories on business days. Listing dates are
+    staggered so the panel has leading gaps like the real index does.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2024-06-28", periods=252 * years)
+    frames = {}
+    for s in range(symbols):
+        start = rng.integers(0, len(dates) // 4)
+        n = len(dates) - start
+        close = rng.uniform(100, 5000) * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        spread = rng.uniform(0.005, 0.03, n)
+        frames["SYM{}".format(s)] = pd.DataFrame({
+            "DATE": dates[start:],
+            "OPEN": close * rng.uniform(0.99, 1.01, n),
+            "HIGH": close * (1 + spread),
+            "LOW": close * (1 - spread),
+            "CLOSE": close,
+            "VWAP": close * rng.uniform(0.995, 1.005, n),
+            "VOLUME": rng.integers(10 ** 4, 10 ** 7, n).astype(float),
+        })
+    return frames
+
+
+def pandas_screen(df):
+    close, high, low = df["CLOSE"], df["HIGH"], df["LOW"]
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    loss = (-change.clip(upper=0)).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    trigger = line.ewm(span=9, adjust=False).mean()
+    middle, width = close.rolling(20).mean(), 2 * close.rolling(20).std(ddof=0)
+    tr = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)
+    return pd.DataFrame({
+        "RSI14": 100 - 100 / (1 + gain / loss),
+        "MACD": line,
+        "MACD_SIGNAL": trigger,
+        "MACD_HIST": line - trigger,
+        "BB_MIDDLE": middle,
+        "BB_UPPER": middle + width,
+        "BB_LOWER": middle - width,
+        "ATR14": tr.ewm(alpha=1 / 14, adjust=False).mean(),
+        "VWAP20": (df["VWAP"] * df["VOLUME"]).rolling(20).sum() / df["VOLUME"].rolling(20).sum(),
+        "VOLATILITY20": np.log(close / close.shift()).rolling(20).std() * np.sqrt(252),
+    })
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=45)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = fake_frames(args.symbols, args.years)
+    panel = panel_from_frames(frames)
+    print("panel: {} dates x {} symbols".format(*panel.shape))
+
+    old, old_out = timed(lambda: {s: pandas_screen(df) for s, df in frames.items()}, args.repeat)
+    build, _ = timed(lambda: panel_from_frames(frames), args.repeat)
+    new, new_out = timed(lambda: screen(panel), args.repeat)
+
+    for j, symbol in enumerate(panel.symbols):
+        rows = np.searchsorted(panel.dates, frames[symbol]["DATE"])
+        for name, values in new_out.items():
+            np.testing.assert_allclose(values[rows, j], old_out[symbol][name].to_numpy(), rtol=1e-9, atol=1e-8, equal_nan=True)
+
+    print("per-symbol pandas: {:8.3f}s".format(old))
+    print("panel build:       {:8.3f}s".format(build))
+    print("panel screen:      {:8.3f}s".format(new))
+    print("speedup:           {:8.1f}x".format(old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares the row-wise stock_df parser with the vectorized one.
+
+    python benchmarks/bench_parse.py --symbols 45 --years 10
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+
+import pandas as pd
+import niftyScrape
+from niftyScrape import stock_select_headers, stock_final_headers, stock_dtypes
+
+
+def fake_rows(symbols, years, seed=0):
+    """
+    Rows shaped like the /api/historical/cm/equity payload, with the
+    comma-formatted numbers and DD-Mon-YYYY dates the row-wise parser expects
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1) - timedelta(days=365 * years)
+    rows = []
+    for s in range(symbols):
+        price = rng.uniform(100, 5000)
+        for d in range(365 * years):
+            price *= 1 + rng.gauss(0, 0.02)
+            row = {h: "{:,.2f}".format(price * rng.uniform(0.97, 1.03)) for h in stock_select_headers}
+            row["CH_TIMESTAMP"] = (start + timedelta(days=d)).strftime("%d-%b-%Y")
+            row["CH_SERIES"] = "EQ"
+            row["CH_SYMBOL"] = "SYM{}".format(s)
+            row["CH_TOT_TRADED_QTY"] = "{:,}".format(rng.randint(1000, 10 ** 7))
+            row["CH_TOTAL_TRADES"] = "{:,}".format(rng.randint(10, 10 ** 5))
+            rows.append(row)
+    return rows
+
+
+def parse_rowwise(raw):
+    df = pd.DataFrame(raw)[stock_select_headers]
+    df.columns = stock_final_headers
+    for i, h in enumerate(stock_final_headers):
+        df[h] = df[h].apply(stock_dtypes[i])
+    return df
+
+
+def timed(func, raw, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = func(raw)
+        best = min(best, time.perf_counter() - start)
+    return best, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=5)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = fake_rows(args.symbols, args.years)
+    print("rows: {:,}".format(len(raw)))
+
+    old, old_df = timed(parse_rowwise, raw, args.repeat)
+    new, new_df = timed(niftyScrape._parse_raw, raw, args.repeat)
+
+    for h in stock_final_headers:
+        pd.testing.assert_series_equal(old_df[h], new_df[h], check_dtype=False, check_names=False)
+
+    print("row-wise:   {:8.3f}s  {:>12,.0f} rows/s".format(old, len(raw) / old))
+    print("vectorized: {:8.3f}s  {:>12,.0f} rows/s".format(new, len(raw) / new))
+    print("speedup:    {:8.1f}x".format(old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Offline scraper benchmark against the replaying fake NSE server.
+
+    python benchmarks/bench_scraper.py --workers 2 8 16 --chunk-days 30 90 --symbols 1 5 --latency 0.1
+
+Every scenario runs in a fresh process so its peak RSS is its own. The
+single-symbol targets scrape the symbols one after another, stock_many
+fetches them all at once through batch.iter_stock_many.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import itertools
+import multiprocessing
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "scraper"))
+sys.path.append(HERE)
+
+from fake_nse import FakeNSE, load_recordings
+
+TARGETS = ("stock_raw", "stock_csv", "stock_df", "stock_many")
+
+
+def run_scenario(url, target, workers, chunk_days, symbols, from_date, to_date):
+    import batch
+    import niftyScrape
+    from throttle import TokenBucket
+
+    niftyScrape.NSEHistory.base_url = url
+    niftyScrape.NSEHistory.workers = workers
+    niftyScrape.NSEHistory.chunk_days = chunk_days
+    niftyScrape.NSEHistory.use_cache = False
+    niftyScrape.NSEHistory.limiter = TokenBucket(rate=10 ** 6, capacity=10 ** 6)
+
+    parse_time = 0.0
+    parse_raw = niftyScrape._parse_raw
+
+    def timed_parse(raw):
+        nonlocal parse_time
+        start = time.perf_counter()
+        try:
+            return parse_raw(raw)
+        finally:
+            parse_time += time.perf_counter() - start
+
+    niftyScrape._parse_raw = batch._parse_raw = timed_parse
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    rows = 0
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        if target == "stock_many":
+            for _, df in batch.iter_stock_many(symbols, from_date, to_date, concurrency=workers):
+                rows += len(df)
+            symbols = []
+        for symbol in symbols:
+            if target == "stock_raw":
+                rows += len(niftyScrape.NSEHistory().stock_raw(symbol, from_date, to_date))
+            elif target == "stock_df":
+                rows += len(niftyScrape.stock_df(symbol, from_date, to_date))
+            else:
+                output = os.path.join(tmp, symbol + ".csv")
+                niftyScrape.stock_csv(symbol, from_date, to_date, output=output, show_progress=False)
+                with open(output) as fp:
+                    rows += sum(1 for _ in fp) - 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed": elapsed,
+        "rows": rows,
+        "parse_time": parse_time,
+        "base_rss_mb": base_rss / 1024,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=TARGETS)
+    parser.add_argument("--workers", nargs="+", type=int, default=[2, 8])
+    parser.add_argument("--chunk-days", nargs="+", type=int, default=[30])
+    parser.add_argument("--symbols", nargs="+", type=int, default=[1])
+    parser.add_argument("--from-date", default="2013-01-01")
+    parser.add_argument("--to-date", default="2024-06-27")
+    parser.add_argument("--recordings", help="directory of <SYMBOL>.json payloads")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, help="server-side throttle in requests per second")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    from_date = datetime.strptime(args.from_date, "%Y-%m-%d")
+    to_date = datetime.strptime(args.to_date, "%Y-%m-%d")
+    fake = FakeNSE(load_recordings(args.recordings), args.latency, args.jitter, args.error_rate, args.rate).start()
+    context = multiprocessing.get_context("spawn")
+
+    header = "{:<10} {:>7} {:>6} {:>7} {:>9} {:>9} {:>11} {:>9} {:>9}".format(
+        "target", "workers", "chunk", "symbols", "seconds", "req/s", "rows/s", "parse s", "peak MB")
+    print(header)
+    print("-" * len(header))
+    results = []
+    try:
+        for target, workers, chunk_days, n in itertools.product(args.targets, args.workers, args.chunk_days, args.symbols):
+            symbols = ["SYM{}".format(i) for i in range(n)]
+            fake.reset_counters()
+            with context.Pool(1) as pool:
+                r = pool.apply(run_scenario, (fake.url, target, workers, chunk_days, symbols, from_date, to_date))
+            r.update(target=target, workers=workers, chunk_days=chunk_days, symbols=n, requests=fake.requests)
+            results.append(r)
+            print("{:<10} {:>7} {:>6} {:>7} {:>9.2f} {:>9.1f} {:>11,.0f} {:>9.3f} {:>9.1f}".format(
+                target, workers, chunk_days, n, r["elapsed"], r["requests"] / r["elapsed"],
+                r["rows"] / r["elapsed"], r["parse_time"], r["peak_rss_mb"]))
+    finally:
+        fake.stop()
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump(results, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Import-time and cold-start report for the Streamlit pages.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --json startup.json --budget-ms 3000
+
+Each page's top-level imports (and the sys.path setup before them) run in
+a fresh interpreter under -X importtime, without the page's Streamlit
+calls. The report lists the slowest top-level modules by cumulative
+milliseconds, the total import time and the wall time of the whole
+interpreter. The exit status is 1 when a page imports a module it must
+leave to first use (TensorFlow anywhere, model libraries outside the
+prediction page) or goes over --budget-ms, so CI can track it.
+"""
+import os
+import re
+import ast
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+APP_DIR = os.path.join(ROOT, "app")
+
+PAGES = ("app.py", "pages/Analysis.py", "pages/predictions.py")
+# Loaded on first use only, never while a page starts
+FORBIDDEN = {
+    "app.py": ("tensorflow", "keras", "statsmodels", "sklearn", "scipy"),
+    "pages/Analysis.py": ("tensorflow", "keras", "statsmodels", "sklearn"),
+    "pages/predictions.py": ("tensorflow", "keras", "statsmodels", "sklearn"),
+}
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_block(path):
+    """
+    Source of the page's top-level imports and sys.path changes, in order
+    """
+    tree = ast.parse(open(path, encoding="utf-8").read(), path)
+    keep = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            keep.append(node)
+        elif isinstance(node, ast.Expr) and "sys.path" in ast.unparse(node):
+            keep.append(node)
+    return "\n".join(ast.unparse(node) for node in keep)
+
+
+def measure(page, python=sys.executable):
+    """
+    Runs the page's import block in a fresh interpreter. Returns the wall
+    time and {module: (self ms, cumulative ms, depth)}.
+    """
+    path = os.path.join(APP_DIR, page)
+    code = f"import sys, os\n__file__ = {path!r}\nsys.path.insert(0, {os.path.dirname(path)!r})\n" \
+           f"sys.path.insert(0, {APP_DIR!r})\n" + import_block(path)
+    started = time.perf_counter()
+    result = subprocess.run([python, "-X", "importtime", "-c", code], cwd=os.path.dirname(path),
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(f"{page}: imports failed\n{result.stderr[-2000:]}")
+    modules = {}
+    for match in LINE.finditer(result.stderr):
+        own, cumulative, indent, name = match.groups()
+        modules[name] = (int(own) / 1000, int(cumulative) / 1000, len(indent) // 2)
+    return wall, modules
+
+
+def report(page, wall, modules, top=15):
+    roots = {name: cum for name, (_, cum, depth) in modules.items() if depth == 0}
+    total = sum(roots.values())
+    forbidden = sorted({name.split(".")[0] for name in modules} & set(FORBIDDEN.get(page, ())))
+    slowest = sorted(roots.items(), key=lambda item: -item[1])[:top]
+    return {
+        "page": page,
+        "wall_ms": round(wall * 1000, 1),
+        "import_ms": round(total, 1),
+        "modules": len(modules),
+        "forbidden": forbidden,
+        "slowest": [{"module": name, "ms": round(ms, 1)} for name, ms in slowest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=list(PAGES))
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level modules to list per page")
+    parser.add_argument("--budget-ms", type=float, help="fail when a page's wall time goes over this")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    results, failed = [], False
+    for page in args.pages:
+        entry = report(page, *measure(page), top=args.top)
+        results.append(entry)
+        print(f"{page}: {entry['wall_ms']:.0f} ms cold start, {entry['import_ms']:.0f} ms in {entry['modules']} imports")
+        for item in entry["slowest"]:
+            print(f"    {item['ms']:8.1f} ms  {item['module']}")
+        if entry["forbidden"]:
+            failed = True
+            print(f"    imports {', '.join(entry['forbidden'])} at start", file=sys.stderr)
+        if args.budget_ms and entry["wall_ms"] > args.budget_ms:
+            failed = True
+            print(f"    over the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump(results, fp, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Local stand-in for nseindia.com that replays recorded history payloads.
+
+    python benchmarks/fake_nse.py --port 8765 --latency 0.2 --error-rate 0.05 --rate 20
+
+Recordings are JSON files named <SYMBOL>.json holding the "data" list of
+/api/historical/cm/equity responses. Without recordings the CSVs in data/
+are converted back into that shape. Symbols with no recording replay the
+first one under their own name, so any number of symbols can be served.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraper"))
+
+from niftyScrape import stock_select_headers, stock_final_headers
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+
+def load_recordings(path=None):
+    """
+    Returns {symbol: rows} with rows sorted by CH_TIMESTAMP
+    """
+    recordings = {}
+    if path:
+        for name in os.listdir(path):
+            if name.endswith(".json"):
+                with open(os.path.join(path, name)) as fp:
+                    recordings[name[:-5]] = json.load(fp)
+    else:
+        for name in os.listdir(DATA_DIR):
+            if name.startswith("historical_stock_data_") and name.endswith(".csv"):
+                symbol = name[len("historical_stock_data_"):-4]
+                with open(os.path.join(DATA_DIR, name), newline="") as fp:
+                    recordings[symbol] = [
+                        {s: row[f] for s, f in zip(stock_select_headers, stock_final_headers)}
+                        for row in csv.DictReader(fp)
+                    ]
+    for rows in recordings.values():
+        rows.sort(key=lambda row: row["CH_TIMESTAMP"])
+    return recordings
+
+
+class FakeNSE:
+    """
+    Threaded HTTP server with configurable latency, error rate and throttling.
+    Requests above `rate` per second get 429 with a Retry-After header.
+    """
+
+    def __init__(self, recordings=None, latency=0.0, jitter=0.0, error_rate=0.0, rate=None, port=0):
+        self.recordings = recordings or load_recordings()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate = rate
+        self.requests = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._window = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server.server_port)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.rows = 0
+
+    def _throttled(self):
+        if not self.rate:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate:
+                return True
+            self._window.append(now)
+        return False
+
+    def history(self, symbol, from_date, to_date):
+        rows = self.recordings.get(symbol)
+        if rows is None:
+            rows = [dict(row, CH_SYMBOL=symbol) for row in next(iter(self.recordings.values()))]
+        lo, hi = from_date.strftime("%Y-%m-%d"), to_date.strftime("%Y-%m-%d")
+        return [row for row in reversed(rows) if lo <= row["CH_TIMESTAMP"][:10] <= hi]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if not url.path.startswith("/api/historical/cm/equity"):
+                    self._send(200, b"<html></html>", {"Set-Cookie": "nseappid=fake; Path=/"})
+                    return
+                with fake._lock:
+                    fake.requests += 1
+                if fake._throttled():
+                    self._send(429, headers={"Retry-After": "1"})
+                    return
+                time.sleep(max(0.0, fake.latency + random.uniform(-fake.jitter, fake.jitter)))
+                if random.random() < fake.error_rate:
+                    self._send(503)
+                    return
+                q = parse_qs(url.query)
+                rows = fake.history(
+                    q["symbol"][0],
+                    datetime.strptime(q["from"][0], "%d-%m-%Y"),
+                    datetime.strptime(q["to"][0], "%d-%m-%Y"),
+                )
+                with fake._lock:
+                    fake.rows += len(rows)
+                self._send(200, json.dumps({"data": rows}).encode(), {"Content-Type": "application/json"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replaying stand-in for the NSE history API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recordings", help="directory of <SYMBOL>.json payloads")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, help="requests per second before answering 429")
+    args = parser.parse_args()
+
+    fake = FakeNSE(load_recordings(args.recordings), args.latency, args.jitter, args.error_rate, args.rate, args.port)
+    print("serving on", fake.url)
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
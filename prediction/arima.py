@@ -0,0 +1,262 @@
+"""
+Per-symbol ARIMA models with cached orders and parameters.
+
+    python prediction/arima.py --all --search --workers 8   # pick orders, fit
+    python prediction/arima.py --all                        # daily: append new rows
+    python prediction/arima.py --symbols SBIN --refit       # re-estimate, same order
+
+Order search fits every (p, d, q) candidate for every symbol as one flat
+task list on a process pool, so all cores stay busy whatever the mix of
+symbols. d comes from repeated ADF tests. The winning order and its
+parameters are kept in the symbol's models/registry.json entry and the
+filtered results in models/ARIMA/<SYMBOL>.pkl.
+
+New daily rows are fed to the cached model with a state-space append, i.e.
+one Kalman filter pass at fixed parameters and no re-estimation. Keeping
+every symbol current therefore costs milliseconds per symbol. --refit
+re-estimates the parameters for the cached order, starting from the
+cached values.
+"""
+import os
+import sys
+import time
+import pickle
+import warnings
+import argparse
+import itertools
+from concurrent.futures import as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+sys.path.append(os.path.join(HERE, "..", "app"))
+
+import numpy as np
+
+from pools import process_pool
+
+P_RANGE = range(0, 6)
+Q_RANGE = range(0, 3)
+MAX_D = 2
+
+
+def choose_d(y, max_d=MAX_D, alpha=0.05):
+    """
+    Smallest number of differences after which the ADF test rejects a unit root
+    """
+    from statsmodels.tsa.stattools import adfuller
+
+    y = np.asarray(y, dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for d in range(max_d):
+            if adfuller(y, autolag="AIC")[1] < alpha:
+                return d
+            y = np.diff(y)
+    return max_d
+
+
+def candidates(d, p_range=P_RANGE, q_range=Q_RANGE):
+    return [(p, d, q) for p, q in itertools.product(p_range, q_range)]
+
+
+def fit(y, order, start_params=None, maxiter=50):
+    """
+    Estimates one ARIMA order. Returns the order, parameters and information
+    criteria (small enough to ship between processes), or None when the fit fails.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            results = ARIMA(np.asarray(y, dtype=np.float64), order=order).fit(
+                start_params=start_params, method_kwargs={"maxiter": maxiter})
+        except (ValueError, np.linalg.LinAlgError):
+            return None
+    if not np.isfinite(results.aic):
+        return None
+    return {
+        "order": list(order),
+        "params": results.params.tolist(),
+        "aic": float(results.aic),
+        "bic": float(results.bic),
+        "converged": bool(results.mle_retvals.get("converged", True)) if results.mle_retvals else True,
+    }
+
+
+def search(series, workers=None, criterion="aic", p_range=P_RANGE, q_range=Q_RANGE):
+    """
+    Order search for {symbol: values}. Returns {symbol: best fit()} by
+    `criterion`; symbols where every candidate failed are left out.
+    """
+    best = {}
+    # One BLAS thread per process, the pool supplies the parallelism
+    with process_pool(workers) as pool:
+        futures = {}
+        for symbol, y in series.items():
+            d = choose_d(y)
+            for order in candidates(d, p_range, q_range):
+                futures[pool.submit(fit, y, order)] = symbol
+        for future in as_completed(futures):
+            symbol, result = futures[future], future.result()
+            if result is not None and (symbol not in best or result[criterion] < best[symbol][criterion]):
+                best[symbol] = result
+    return best
+
+
+def refit(series, cached, workers=None):
+    """
+    Re-estimates each symbol's cached order on its full history, starting
+    from the cached parameters
+    """
+    fits = {}
+    # One BLAS thread per process, the pool supplies the parallelism
+    with process_pool(workers) as pool:
+        futures = {
+            pool.submit(fit, series[s], tuple(cached[s]["order"]), np.asarray(cached[s]["params"])): s
+            for s in series if s in cached
+        }
+        for future in as_completed(futures):
+            if future.result() is not None:
+                fits[futures[future]] = future.result()
+    return fits
+
+
+def build(y, order, params):
+    """
+    Results object for fixed parameters: one filter pass, no optimization
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return ARIMA(np.asarray(y, dtype=np.float64), order=tuple(order)).filter(np.asarray(params))
+
+
+def update(results, new_values):
+    """
+    Appends new observations to a fitted model, keeping its parameters
+    """
+    new_values = np.asarray(new_values, dtype=np.float64)
+    if not len(new_values):
+        return results
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return results.append(new_values, refit=False)
+
+
+def walk_forward(results, y, start):
+    """
+    Rolling-origin one-step forecasts for y[start:] with the parameters of
+    `results`: the forecast for y[t] only sees y[:t]. The state is filtered
+    up to `start` and then every observed value is added with a filter
+    update, so nothing is refitted. Returns (forecasts, results at the end
+    of y), and the latter can forecast beyond the data.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        history = results.apply(y[:start])
+        if start >= len(y):
+            return np.empty(0), history
+        tail = history.extend(y[start:])
+        return np.asarray(tail.predict(start=0, end=len(y) - start - 1)), tail
+
+
+def save(symbol, results, info, last_date, version=None):
+    """
+    Pickles the results to models/ARIMA/<SYMBOL>.pkl and records the order
+    and parameters in the registry
+    """
+    from registry import registry
+
+    directory = os.path.join(registry.models_dir, "ARIMA")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{symbol}.pkl")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(results, f)
+    os.replace(tmp, path)
+    return registry.register(
+        symbol, "ARIMA", path, version=version, order=list(info["order"]), params=list(info["params"]),
+        aic=info.get("aic"), bic=info.get("bic"), nobs=int(results.nobs), last_date=last_date,
+    )
+
+
+def cached_entry(symbol):
+    """
+    The symbol's own ARIMA registry entry, or None (the generic model does not count)
+    """
+    from registry import registry
+
+    try:
+        entry = registry.resolve(symbol, "ARIMA")
+    except KeyError:
+        return None
+    return None if entry["generic"] or "order" not in entry else entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--symbols", nargs="+")
+    group.add_argument("--all", action="store_true", help="every symbol in the data catalog")
+    parser.add_argument("--search", action="store_true", help="run the order search even for cached symbols")
+    parser.add_argument("--refit", action="store_true", help="re-estimate parameters of cached orders")
+    parser.add_argument("--criterion", default="aic", choices=("aic", "bic"))
+    parser.add_argument("--max-p", type=int, default=max(P_RANGE))
+    parser.add_argument("--max-q", type=int, default=max(Q_RANGE))
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    from catalog import get_catalog
+    from registry import registry, cache
+
+    catalog = get_catalog()
+    symbols = catalog.symbols() if args.all else args.symbols
+    data = {}
+    for symbol in symbols:
+        try:
+            df = catalog.load(symbol, columns=["CLOSE"])
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+            continue
+        data[registry.canonical(symbol)] = df
+
+    started = time.perf_counter()
+    cached = {s: e for s, e in ((s, cached_entry(s)) for s in data) if e is not None}
+    to_search = [s for s in data if args.search or s not in cached]
+    to_refit = [s for s in cached if args.refit and s not in to_search]
+
+    fitted = {}
+    if to_search:
+        print(f"searching {len(to_search)} symbols")
+        fitted.update(search({s: data[s]["CLOSE"].to_numpy() for s in to_search}, args.workers, args.criterion,
+                             range(args.max_p + 1), range(args.max_q + 1)))
+    if to_refit:
+        print(f"refitting {len(to_refit)} symbols")
+        fitted.update(refit({s: data[s]["CLOSE"].to_numpy() for s in to_refit}, cached, args.workers))
+
+    for symbol, df in data.items():
+        last_date = df["DATE"].iloc[-1].strftime("%Y-%m-%d")
+        if symbol in fitted:
+            info = fitted[symbol]
+            results = build(df["CLOSE"].to_numpy(), info["order"], info["params"])
+            entry = save(symbol, results, info, last_date, version=cached[symbol]["version"] if symbol in cached else None)
+            print(f"{symbol}: ARIMA{tuple(info['order'])} {args.criterion}={info[args.criterion]:.1f}")
+        elif symbol in cached:
+            entry = cached[symbol]
+            results = cache.get(entry["path"])
+            new = df[df["DATE"] > entry["last_date"]]["CLOSE"].to_numpy()
+            if not len(new):
+                continue
+            results = update(results, new)
+            save(symbol, results, entry, last_date, version=entry["version"])
+            print(f"{symbol}: appended {len(new)} rows")
+        else:
+            print(f"{symbol}: no ARIMA order could be fitted", file=sys.stderr)
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Walk-forward backtests for the LSTM, GRU and ARIMA models (plus a naive
+last-close baseline) on identical folds.
+
+    python prediction/backtest.py --all --folds 5 --test-size 60 --workers 8
+    python prediction/backtest.py --symbols SBIN --mode sliding --train-size 750 --in-sample LSTM GRU
+
+The last folds x test-size rows are cut into consecutive test windows.
+Each fold trains on an expanding history or on a sliding window before its
+test rows. Every model makes one-step forecasts over the test rows from the
+actual history, so all families are scored on the same days. By default
+every model is estimated on each fold's training rows only, so no test day
+leaks into training: ARIMA re-estimates the symbol's cached order (starting
+from the cached parameters) and LSTM/GRU are retrained. --in-sample scores
+the registered models as they are instead. They have seen the test days,
+so their rows are labelled "<MODEL> (in-sample)".
+
+Each (symbol, model, fold) is one task on a process pool. Results are
+cached under .cache/backtests, keyed by the fold, the data it saw and the
+model settings, so re-runs only compute what changed. MAPE, MAE, RMSE and
+directional accuracy come from one set of array reductions over
+(symbol, model, fold, day).
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+sys.path.append(os.path.join(HERE, "..", "app"))
+
+import numpy as np
+import pandas as pd
+
+from windowing import make_windows
+from pools import process_pool
+
+MODEL_TYPES = ("LSTM", "GRU", "ARIMA", "NAIVE")
+CACHE_DIR = os.path.join(HERE, "..", ".cache", "backtests")
+DEFAULT_ARIMA_ORDER = (5, 2, 0)
+METRICS = ("MAPE", "MAE", "RMSE", "DIRECTION")
+
+
+def make_folds(n, folds=5, test_size=60, mode="expanding", train_size=500):
+    """
+    (train_start, train_end, test_end) row bounds for `folds` consecutive
+    test windows that end at row n. Sliding folds train on the last
+    `train_size` rows before their test window, expanding ones on everything.
+    """
+    first = n - folds * test_size
+    if first < train_size:
+        raise ValueError(f"{n} rows leave fewer than {train_size} training rows for {folds} x {test_size} test rows")
+    bounds = []
+    for k in range(folds):
+        train_end = first + k * test_size
+        train_start = 0 if mode == "expanding" else train_end - train_size
+        bounds.append((train_start, train_end, train_end + test_size))
+    return bounds
+
+
+def metrics(y_true, y_pred, previous):
+    """
+    Scores over the last axis of (..., days) arrays. `previous` is the actual
+    close before each day, so directional accuracy is the share of days on
+    which the forecast moved the same way as the price.
+    """
+    error = y_pred - y_true
+    return {
+        "MAPE": np.mean(np.abs(error) / np.abs(y_true), axis=-1),
+        "MAE": np.mean(np.abs(error), axis=-1),
+        "RMSE": np.sqrt(np.mean(error ** 2, axis=-1)),
+        "DIRECTION": np.mean(np.sign(y_pred - previous) == np.sign(y_true - previous), axis=-1),
+    }
+
+
+def _predict_naive(closes, fold, options):
+    _, train_end, test_end = fold
+    return closes[train_end - 1:test_end - 1]
+
+
+def _predict_arima(closes, fold, options):
+    import arima
+
+    train_start, train_end, test_end = fold
+    order = options.get("order") or DEFAULT_ARIMA_ORDER
+    history = closes[train_start:train_end]
+    if options.get("refit", True) or not options.get("params"):
+        fitted = arima.fit(history, order, start_params=options.get("params"))
+        if fitted is None:
+            raise ValueError(f"ARIMA{tuple(order)} could not be fitted")
+        params = fitted["params"]
+    else:
+        params = options["params"]
+    results = arima.build(history, order, params)
+    forecasts, _ = arima.walk_forward(results, closes[train_start:test_end], train_end - train_start)
+    return forecasts
+
+
+def _predict_network(closes, fold, options):
+    import pickle
+    from sklearn.preprocessing import MinMaxScaler
+
+    train_start, train_end, test_end = fold
+    window = options.get("window", 60)
+    if options.get("refit"):
+        from tensorflow import keras
+        from train import train_one
+
+        with tempfile.TemporaryDirectory() as checkpoints:
+            result = train_one("fold", options["type"], closes[train_start:train_end], window_size=window,
+                               epochs=options.get("epochs", 50), patience=options.get("patience", 5),
+                               checkpoint_dir=checkpoints)
+            model = keras.models.load_model(result["model_path"])
+            with open(result["scaler_path"], "rb") as f:
+                scaler = pickle.load(f)
+    else:
+        from registry import cache
+
+        model = cache.get(options["path"])
+        if options.get("scaler"):
+            with open(options["scaler"], "rb") as f:
+                scaler = pickle.load(f)
+        else:
+            scaler = MinMaxScaler().fit(closes[train_start:train_end].reshape(-1, 1))
+    scaled = scaler.transform(closes[train_end - window:test_end].reshape(-1, 1)).astype(np.float32)
+    X, _ = make_windows(scaled, window)
+    y = model.predict(np.ascontiguousarray(X[:test_end - train_end]), batch_size=256, verbose=0)
+    return scaler.inverse_transform(np.asarray(y).reshape(-1, 1)).ravel()
+
+
+PREDICTORS = {"NAIVE": _predict_naive, "ARIMA": _predict_arima, "LSTM": _predict_network, "GRU": _predict_network}
+
+
+def run_fold(model_type, closes, fold, options):
+    """
+    One-step forecasts for the fold's test rows; returns (actual, forecast, previous close)
+    """
+    _, train_end, test_end = fold
+    forecasts = np.asarray(PREDICTORS[model_type](closes, fold, options), dtype=np.float64)
+    return closes[train_end:test_end], forecasts, closes[train_end - 1:test_end - 1]
+
+
+def model_options(symbol, model_type, in_sample=False, epochs=50):
+    """
+    Everything a fold needs to rebuild the symbol's model, taken from the
+    registry. It is also part of the cache key. `in_sample` reuses the
+    registered model instead of estimating one per fold.
+    """
+    from registry import registry
+
+    options = {"type": model_type, "refit": not in_sample, "in_sample": False}
+    if model_type == "ARIMA":
+        import arima
+
+        entry = arima.cached_entry(symbol)
+        if entry:
+            options.update(order=entry["order"], params=entry["params"], in_sample=in_sample)
+        options["refit"] = not options["in_sample"]
+    elif model_type in ("LSTM", "GRU"):
+        entry = registry.resolve(symbol, model_type)
+        options["window"] = entry.get("window", 60)
+        options["in_sample"] = in_sample
+        if not in_sample:
+            options["epochs"] = epochs
+        else:
+            options["path"] = entry["path"]
+            options["mtime"] = os.path.getmtime(entry["path"])
+            if entry.get("scaler"):
+                options["scaler"] = os.path.join(registry.models_dir, entry["scaler"])
+    return options
+
+
+def _cache_path(symbol, model_type, closes, fold, options):
+    key = hashlib.sha1()
+    key.update(closes[:fold[2]].tobytes())
+    key.update(json.dumps([fold, options], sort_keys=True, default=str).encode())
+    return os.path.join(CACHE_DIR, symbol, model_type, key.hexdigest()[:20] + ".npz")
+
+
+def backtest(series, model_types=MODEL_TYPES, folds=5, test_size=60, mode="expanding", train_size=500,
+             in_sample=(), epochs=50, workers=None, threads=1, use_cache=True, on_result=None):
+    """
+    Runs every (symbol, model, fold) for {symbol: closes}. Returns a frame
+    with one row per (symbol, model, fold) and a column per metric.
+    Models are estimated per fold except the types in `in_sample`, which
+    reuse the registered model and are labelled "<MODEL> (in-sample)".
+    Models missing for a symbol are skipped. workers=0 runs in-process.
+    `on_result(key, finished, total)` is called as each uncached fold
+    finishes, counting failed folds as finished.
+    """
+    tasks, done = {}, {}
+    for symbol, closes in series.items():
+        closes = np.asarray(closes, dtype=np.float64)
+        bounds = make_folds(len(closes), folds, test_size, mode, train_size)
+        for model_type in model_types:
+            try:
+                options = model_options(symbol, model_type, model_type in in_sample, epochs)
+            except KeyError:
+                continue
+            label = f"{model_type} (in-sample)" if options["in_sample"] else model_type
+            for k, fold in enumerate(bounds):
+                path = _cache_path(symbol, model_type, closes, fold, options)
+                if use_cache and os.path.exists(path):
+                    with np.load(path) as cached:
+                        done[(symbol, label, k)] = (cached["actual"], cached["forecast"], cached["previous"])
+                else:
+                    tasks[(symbol, label, k)] = (closes, fold, options, path)
+
+    finished = 0
+
+    def finish(key, compute):
+        nonlocal finished
+        finished += 1
+        try:
+            result = compute()
+        except Exception as e:
+            print(f"[{finished}/{len(tasks)}] {' '.join(map(str, key))}: failed: {e}", file=sys.stderr)
+            return
+        done[key] = result
+        path = tasks[key][3]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, actual=result[0], forecast=result[1], previous=result[2])
+        if on_result:
+            on_result(key, finished, len(tasks))
+
+    if workers == 0:
+        for key, (closes, fold, options, _) in tasks.items():
+            finish(key, lambda: run_fold(options["type"], closes, fold, options))
+    elif tasks:
+        with process_pool(workers, threads) as pool:
+            futures = {pool.submit(run_fold, task[2]["type"], *task[:3]): key for key, task in tasks.items()}
+            for future in as_completed(futures):
+                finish(futures[future], future.result)
+
+    if not done:
+        return pd.DataFrame(columns=["symbol", "model", "fold"] + list(METRICS))
+    keys = sorted(done)
+    actual, forecast, previous = (np.stack([done[k][i] for k in keys]) for i in range(3))
+    scores = metrics(actual, forecast, previous)
+    frame = pd.DataFrame(keys, columns=["symbol", "model", "fold"])
+    for name in METRICS:
+        frame[name] = scores[name]
+    return frame
+
+
+def summary(frame):
+    """
+    Mean of each metric over the folds, one row per (symbol, model)
+    """
+    return frame.groupby(["symbol", "model"])[list(METRICS)].mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--symbols", nargs="+")
+    group.add_argument("--all", action="store_true", help="every symbol in the data catalog")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_TYPES), choices=MODEL_TYPES)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-size", type=int, default=60, help="test rows per fold")
+    parser.add_argument("--mode", default="expanding", choices=("expanding", "sliding"))
+    parser.add_argument("--train-size", type=int, default=500, help="sliding window length / minimum history")
+    parser.add_argument("--in-sample", nargs="+", default=[], choices=MODEL_TYPES,
+                        help="score these registered models as they are, although they have seen the test days")
+    parser.add_argument("--epochs", type=int, default=50, help="epochs per fold when retraining LSTM/GRU")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int, default=1, help="BLAS/TensorFlow threads per worker")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--csv", help="also write the per-fold scores to this file")
+    args = parser.parse_args()
+
+    from catalog import get_catalog
+
+    catalog = get_catalog()
+    symbols = catalog.symbols() if args.all else args.symbols
+    series = {}
+    for symbol in symbols:
+        try:
+            series[symbol] = catalog.load(symbol, columns=["CLOSE"])["CLOSE"].to_numpy()
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+
+    frame = backtest(series, args.models, args.folds, args.test_size, args.mode, args.train_size, args.in_sample,
+                     args.epochs, args.workers, args.threads, not args.no_cache,
+                     on_result=lambda key, n, total: print(f"[{n}/{total}] {' '.join(map(str, key))}", file=sys.stderr))
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(summary(frame).round(4))
+    if args.csv:
+        frame.to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Multi-step autoregressive forecasting for the LSTM/GRU models.
+
+Each step feeds the model's previous prediction back in as the newest input.
+Many symbols or scenarios are rolled forward together, one forward pass per
+step for the whole batch.
+"""
+import weakref
+
+import numpy as np
+
+_graphs = weakref.WeakKeyDictionary()
+
+
+def rollout(model, windows, steps, compiled=None):
+    """
+    Rolls `windows` (batch, window[, features]) forward `steps` times and
+    returns the predictions as a (batch, steps) array.
+
+    Keras models run the whole loop inside one compiled TensorFlow graph.
+    Other callables (or compiled=False) use a preallocated buffer of
+    window + steps values per row and call `model(x, training=False)` on a
+    view of it, so no window is ever rebuilt. Models with their own
+    rollout method (the prediction service's RemoteModel) get the whole job.
+    """
+    windows = np.asarray(windows, dtype=np.float32)
+    if windows.ndim == 2:
+        windows = windows[..., np.newaxis]
+    if hasattr(model, "rollout"):
+        return np.asarray(model.rollout(windows, steps))
+    if compiled is None:
+        compiled = hasattr(model, "trainable_weights")
+    if compiled:
+        return _rollout_graph(model, windows, steps)
+
+    batch, window, features = windows.shape
+    buffer = np.empty((batch, window + steps, features), dtype=np.float32)
+    buffer[:, :window] = windows
+    out = np.empty((batch, steps), dtype=np.float32)
+    for t in range(steps):
+        y = np.asarray(model(buffer[:, t:t + window], training=False), dtype=np.float32).reshape(batch, -1)
+        if y.shape[1] != features:
+            raise ValueError(f"model returns {y.shape[1]} values per step, expected {features}")
+        out[:, t] = y[:, 0]
+        buffer[:, window + t] = y
+    return out
+
+
+def _rollout_graph(model, windows, steps):
+    import tensorflow as tf
+
+    graph = _graphs.get(model)
+    if graph is None:
+        # The graph only holds a weak reference, otherwise the cache entry
+        # would keep its own key alive and never be dropped
+        model_ref = weakref.ref(model)
+
+        @tf.function(reduce_retracing=True)
+        def graph(x, steps):
+            call = model_ref()
+            out = tf.TensorArray(tf.float32, size=steps)
+            for t in tf.range(steps):
+                y = tf.cast(call(x, training=False), tf.float32)
+                out = out.write(t, y[:, 0])
+                x = tf.concat([x[:, 1:], tf.expand_dims(y, 1)], axis=1)
+            return tf.transpose(out.stack())
+
+        _graphs[model] = graph
+    return graph(tf.constant(windows), tf.constant(steps)).numpy()
+
+
+def forecast_many(model, series, window, steps, compiled=None):
+    """
+    Forecasts `steps` values past the end of each scaled 1-D series in
+    `series` ({key: array}) with a single batched rollout.
+    Returns {key: (steps,) array}.
+    """
+    keys = list(series)
+    windows = np.stack([np.asarray(series[k], dtype=np.float32)[-window:] for k in keys])
+    out = rollout(model, windows, steps, compiled=compiled)
+    return dict(zip(keys, out))
@@ -0,0 +1,251 @@
+"""
+TensorFlow-free inference for the LSTM/GRU models.
+
+    python prediction/numpy_runtime.py            # export every registered .keras model
+    python prediction/numpy_runtime.py --check    # ... and compare with Keras
+
+The exporter writes each model's layer settings and weights to an .npz next
+to its .keras file. load() rebuilds the model as plain NumPy: every layer
+turns its whole input sequence into gate pre-activations with one matrix
+product, then steps through time with one (batch, units) @ (units, gates)
+product per step. It only needs NumPy, so a process that serves
+predictions starts in well under a second. Each .npz records the SHA-256
+of the .keras file it came from, and the registry only picks it while that
+still matches, since checkouts and copies do not keep file times.
+
+Supported layers: LSTM, GRU (both reset_after modes), Dense, plus Dropout
+and InputLayer, which do nothing at inference.
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "app"))
+
+import numpy as np
+
+
+def _sigmoid(x):
+    # tanh form: no overflow for large negative inputs
+    return 0.5 * (np.tanh(0.5 * x) + 1)
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "tanh": np.tanh,
+    "sigmoid": _sigmoid,
+    "relu": lambda x: np.maximum(x, 0),
+    "softmax": _softmax,
+}
+WEIGHT_NAMES = {
+    "LSTM": ("kernel", "recurrent_kernel", "bias"),
+    "GRU": ("kernel", "recurrent_kernel", "bias"),
+    "Dense": ("kernel", "bias"),
+}
+PASSTHROUGH = ("InputLayer", "Dropout")
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file's contents, as hex
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_model(model, path, source_digest=""):
+    """
+    Writes a loaded Keras model's layers and weights to `path` (.npz), with
+    the digest of the file the model was loaded from
+    """
+    specs, arrays = [], {}
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind in PASSTHROUGH:
+            continue
+        if kind not in WEIGHT_NAMES:
+            raise ValueError(f"{kind} layers are not supported")
+        config = layer.get_config()
+        spec = {"type": kind, "activation": config.get("activation", "linear")}
+        if kind in ("LSTM", "GRU"):
+            if config.get("go_backwards") or config.get("stateful"):
+                raise ValueError(f"{layer.name}: backwards and stateful layers are not supported")
+            spec.update(recurrent_activation=config["recurrent_activation"],
+                        return_sequences=config["return_sequences"], reset_after=config.get("reset_after", False))
+        unsupported = {spec["activation"], spec.get("recurrent_activation", "linear")} - ACTIVATIONS.keys()
+        if unsupported:
+            raise ValueError(f"{layer.name}: activation {unsupported.pop()} is not supported")
+        for name, weight in zip(WEIGHT_NAMES[kind], layer.get_weights()):
+            arrays[f"{len(specs)}_{name}"] = np.asarray(weight, dtype=np.float32)
+        specs.append(spec)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, layers=np.array(json.dumps(specs)), source=np.array(source_digest), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def export(keras_path, path=None):
+    """
+    Exports a .keras file; the .npz goes next to it by default
+    """
+    from keras.models import load_model
+
+    path = path or os.path.splitext(keras_path)[0] + ".npz"
+    return export_model(load_model(keras_path, compile=False), path, file_digest(keras_path))
+
+
+def _lstm(x, w, spec):
+    act, rec = ACTIVATIONS[spec["activation"]], ACTIVATIONS[spec["recurrent_activation"]]
+    U = w["recurrent_kernel"]
+    units = U.shape[0]
+    gates = x @ w["kernel"]
+    if "bias" in w:
+        gates += w["bias"]
+    batch, steps, _ = x.shape
+    h = np.zeros((batch, units), dtype=np.float32)
+    c = np.zeros((batch, units), dtype=np.float32)
+    out = np.empty((batch, steps, units), dtype=np.float32) if spec["return_sequences"] else None
+    for t in range(steps):
+        z = gates[:, t] + h @ U
+        # Keras gate order: input, forget, cell, output
+        i, f = rec(z[:, :units]), rec(z[:, units:2 * units])
+        c = f * c + i * act(z[:, 2 * units:3 * units])
+        h = rec(z[:, 3 * units:]) * act(c)
+        if out is not None:
+            out[:, t] = h
+    return h if out is None else out
+
+
+def _gru(x, w, spec):
+    act, rec = ACTIVATIONS[spec["activation"]], ACTIVATIONS[spec["recurrent_activation"]]
+    U = w["recurrent_kernel"]
+    units = U.shape[0]
+    bias = w.get("bias", np.zeros((2, 3 * units) if spec["reset_after"] else 3 * units, dtype=np.float32))
+    input_bias, recurrent_bias = (bias[0], bias[1]) if spec["reset_after"] else (bias, 0)
+    gates = x @ w["kernel"] + input_bias
+    batch, steps, _ = x.shape
+    h = np.zeros((batch, units), dtype=np.float32)
+    out = np.empty((batch, steps, units), dtype=np.float32) if spec["return_sequences"] else None
+    for t in range(steps):
+        g = gates[:, t]
+        # Keras gate order: update, reset, candidate
+        if spec["reset_after"]:
+            r_h = h @ U + recurrent_bias
+            z = rec(g[:, :units] + r_h[:, :units])
+            r = rec(g[:, units:2 * units] + r_h[:, units:2 * units])
+            candidate = act(g[:, 2 * units:] + r * r_h[:, 2 * units:])
+        else:
+            r_h = h @ U[:, :2 * units]
+            z = rec(g[:, :units] + r_h[:, :units])
+            r = rec(g[:, units:2 * units] + r_h[:, units:])
+            candidate = act(g[:, 2 * units:] + (r * h) @ U[:, 2 * units:])
+        h = z * h + (1 - z) * candidate
+        if out is not None:
+            out[:, t] = h
+    return h if out is None else out
+
+
+def _dense(x, w, spec):
+    y = x @ w["kernel"]
+    if "bias" in w:
+        y += w["bias"]
+    return ACTIVATIONS[spec["activation"]](y)
+
+
+FORWARD = {"LSTM": _lstm, "GRU": _gru, "Dense": _dense}
+
+
+class NumpyModel:
+    """
+    Inference-only stand-in for the exported Keras model, with the same
+    predict / predict_on_batch / __call__ entry points
+    """
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    def predict_on_batch(self, X):
+        x = np.asarray(X, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[..., np.newaxis]
+        for spec, weights in self.layers:
+            x = FORWARD[spec["type"]](x, weights, spec)
+        return x
+
+    def predict(self, X, batch_size=1024, verbose=0, **kwargs):
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) <= batch_size:
+            return self.predict_on_batch(X)
+        return np.concatenate([self.predict_on_batch(X[i:i + batch_size]) for i in range(0, len(X), batch_size)])
+
+    def __call__(self, X, training=False):
+        return self.predict_on_batch(X)
+
+
+def load(path):
+    with np.load(path, allow_pickle=False) as data:
+        specs = json.loads(str(data["layers"]))
+        layers = [
+            (spec, {name: data[f"{i}_{name}"] for name in WEIGHT_NAMES[spec["type"]] if f"{i}_{name}" in data})
+            for i, spec in enumerate(specs)
+        ]
+    return NumpyModel(layers)
+
+
+def exported_path(keras_path):
+    """
+    The .npz export of a .keras file if one exists and was made from its
+    current contents, else None
+    """
+    path = os.path.splitext(keras_path)[0] + ".npz"
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            source = str(data["source"]) if "source" in data.files else None
+    except (OSError, ValueError):
+        return None
+    return path if source == file_digest(keras_path) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", help=".keras files (default: every registered LSTM/GRU model)")
+    parser.add_argument("--check", action="store_true", help="compare with Keras on random windows")
+    parser.add_argument("--rows", type=int, default=256)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    paths = args.paths
+    if not paths:
+        from registry import registry
+        paths = sorted({os.path.join(registry.models_dir, m["path"]) for m in registry.entries()
+                        if m["type"] in ("LSTM", "GRU") and m["path"].endswith(".keras")})
+    failed = 0
+    for keras_path in paths:
+        path = export(keras_path)
+        line = f"{os.path.relpath(path)}: {os.path.getsize(path) / 1024:.0f} KiB"
+        if args.check:
+            from keras.models import load_model
+
+            reference = load_model(keras_path, compile=False)
+            window = reference.input_shape[1] or 60
+            X = np.random.default_rng(0).random((args.rows, window, 1), dtype=np.float32)
+            error = np.abs(load(path).predict(X) - reference.predict(X, verbose=0)).max()
+            failed += error > args.tolerance
+            line += f", max |numpy - keras| = {error:.2e}"
+        print(line)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
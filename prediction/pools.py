@@ -0,0 +1,37 @@
+"""
+Process pools for the CPU-bound jobs (ARIMA searches, training, backtests).
+
+BLAS, OpenMP and TensorFlow size their thread pools from the environment
+when they load, and a spawned worker imports numpy while it re-imports the
+main module, before any pool initializer could run. The limits are
+therefore set in the parent's environment, which the workers inherit, for
+as long as the pool is open.
+"""
+import os
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+THREAD_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS")
+
+
+@contextmanager
+def process_pool(workers=None, threads=1):
+    """
+    Spawn-based ProcessPoolExecutor whose workers each use `threads` native
+    threads, so workers x threads can match the cores without oversubscription
+    """
+    limits = dict.fromkeys(THREAD_VARIABLES, str(threads))
+    limits.update(TF_NUM_INTEROP_THREADS="1", TF_CPP_MIN_LOG_LEVEL=os.environ.get("TF_CPP_MIN_LOG_LEVEL", "2"))
+    saved = {variable: os.environ.get(variable) for variable in limits}
+    os.environ.update(limits)
+    try:
+        with ProcessPoolExecutor(workers or max((os.cpu_count() or 1) // threads, 1),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            yield pool
+    finally:
+        for variable, value in saved.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
@@ -0,0 +1,277 @@
+"""
+Local prediction service that keeps LSTM/GRU models resident and batches
+requests across users.
+
+    python prediction/service.py --port 8766 --preload
+
+The Streamlit pages send scaled windows here instead of loading models
+themselves. Requests that reach the same model within --max-delay
+milliseconds are stacked into one forward pass (predict) or one rollout,
+and each caller gets back its own rows. Models come from the
+process-wide registry cache and are reloaded when their artifact changes.
+
+Both directions of POST /predict and /rollout carry .npy bytes. The query
+string names the model: symbol, type and optionally version, plus steps
+for /rollout. GET /health answers once the server is up.
+"""
+import io
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+sys.path.append(os.path.join(HERE, "..", "app"))
+
+import numpy as np
+
+# Clear of benchmarks/fake_nse.py, which defaults to 8765
+PORT = 8766
+SERVICE_URL = os.environ.get("STOCKIPY_PREDICTION_SERVICE", f"http://127.0.0.1:{PORT}")
+MAX_DELAY = 0.005
+MAX_BATCH = 4096
+
+
+def _to_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _from_bytes(data):
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+class Batcher:
+    """
+    Collects requests for one model artifact on a queue. A single thread
+    takes the first waiting request, gathers whatever else arrives within
+    max_delay (up to max_batch rows), runs each group of compatible requests
+    as one batch and hands the rows back.
+    """
+
+    def __init__(self, path, max_delay=MAX_DELAY, max_batch=MAX_BATCH):
+        self.path = path
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, kind, X, steps=None):
+        """
+        Blocks until the batch holding X has run and returns X's rows of the output
+        """
+        job = {"kind": kind, "X": np.asarray(X, dtype=np.float32), "steps": steps, "done": threading.Event()}
+        self._queue.put(job)
+        job["done"].wait()
+        if "error" in job:
+            raise job["error"]
+        return job["y"]
+
+    def _gather(self):
+        jobs = [self._queue.get()]
+        rows = len(jobs[0]["X"])
+        deadline = time.monotonic() + self.max_delay
+        while rows < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            rows += len(job["X"])
+        return jobs
+
+    def _run(self):
+        from registry import cache
+        from forecast import rollout
+
+        while True:
+            jobs = self._gather()
+            groups = {}
+            for job in jobs:
+                groups.setdefault((job["kind"], job["steps"], job["X"].shape[1:]), []).append(job)
+            for (kind, steps, _), group in groups.items():
+                try:
+                    model = cache.get(self.path)
+                    X = np.concatenate([job["X"] for job in group])
+                    if kind == "rollout":
+                        y = rollout(model, X, steps)
+                    else:
+                        y = np.asarray(model.predict_on_batch(X))
+                    self.batches += 1
+                    self.requests += len(group)
+                    bounds = np.cumsum([len(job["X"]) for job in group])[:-1]
+                    for job, part in zip(group, np.split(y, bounds)):
+                        job["y"] = part
+                except Exception as e:
+                    for job in group:
+                        job["error"] = e
+                for job in group:
+                    job["done"].set()
+
+
+class PredictionService:
+    """
+    One Batcher per resolved model artifact
+    """
+
+    def __init__(self, max_delay=MAX_DELAY, max_batch=MAX_BATCH):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def batcher(self, symbol, model_type, version=None):
+        from registry import registry
+
+        entry = registry.resolve(symbol, model_type, version)
+        with self._lock:
+            if entry["path"] not in self._batchers:
+                self._batchers[entry["path"]] = Batcher(entry["path"], self.max_delay, self.max_batch)
+            return self._batchers[entry["path"]]
+
+    def stats(self):
+        with self._lock:
+            return {os.path.relpath(path, os.path.join(HERE, "..", "models")): {"batches": b.batches, "requests": b.requests}
+                    for path, b in self._batchers.items()}
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for a burst of sessions connecting at once
+    request_queue_size = 128
+
+
+def _handler(service):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _reply(self, status, body, content_type="application/octet-stream"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message):
+            self._reply(status, json.dumps({"error": message}).encode(), "application/json")
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, json.dumps({"models": service.stats()}).encode(), "application/json")
+            else:
+                self._error(404, f"unknown path {self.path}")
+
+        def do_POST(self):
+            url = urllib.parse.urlsplit(self.path)
+            if url.path not in ("/predict", "/rollout"):
+                return self._error(404, f"unknown path {url.path}")
+            query = dict(urllib.parse.parse_qsl(url.query))
+            try:
+                X = _from_bytes(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                version = int(query["version"]) if query.get("version") else None
+                batcher = service.batcher(query["symbol"], query["type"], version)
+                steps = int(query["steps"]) if url.path == "/rollout" else None
+            except KeyError as e:
+                return self._error(404, str(e.args[0]))
+            except ValueError as e:
+                return self._error(400, str(e))
+            try:
+                y = batcher.submit(url.path[1:], X, steps)
+            except Exception as e:
+                return self._error(500, str(e))
+            self._reply(200, _to_bytes(y))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class RemoteModel:
+    """
+    Stand-in for a Keras model whose predictions come from the service
+    """
+
+    def __init__(self, symbol, model_type, version=None, url=SERVICE_URL, timeout=30):
+        self.query = {"symbol": symbol, "type": model_type}
+        if version is not None:
+            self.query["version"] = version
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, path, X, **params):
+        url = f"{self.url}{path}?{urllib.parse.urlencode(dict(self.query, **params))}"
+        request = urllib.request.Request(url, data=_to_bytes(np.asarray(X, dtype=np.float32)),
+                                         headers={"Content-Type": "application/octet-stream"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return _from_bytes(response.read())
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            try:
+                message = json.loads(body).get("error", str(e))
+            except (ValueError, AttributeError):
+                message = f"{e} from {self.url}, which does not look like the prediction service"
+            raise RuntimeError(message) from None
+
+    def predict(self, X, **kwargs):
+        return self._post("/predict", X)
+
+    def __call__(self, X, training=False):
+        return self.predict(X)
+
+    def rollout(self, windows, steps):
+        return self._post("/rollout", windows, steps=steps)
+
+
+def available(url=SERVICE_URL, timeout=0.5):
+    """
+    True when the prediction service answers at `url`, not just any server
+    """
+    try:
+        with urllib.request.urlopen(f"{url}/health", timeout=timeout) as response:
+            if response.status != 200:
+                return False
+            health = json.loads(response.read())
+    except (OSError, ValueError):
+        return False
+    return isinstance(health, dict) and isinstance(health.get("models"), dict)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-delay", type=float, default=MAX_DELAY * 1000, help="batching window in milliseconds")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="rows per forward pass")
+    parser.add_argument("--preload", action="store_true", help="load every registered LSTM/GRU model at start")
+    args = parser.parse_args()
+
+    if args.preload:
+        import registry
+        registry.preload(model_types=("LSTM", "GRU"))
+    service = PredictionService(args.max_delay / 1000, args.max_batch)
+    server = Server((args.host, args.port), _handler(service))
+    print(f"serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Headless LSTM/GRU training for any list of symbols.
+
+    python prediction/train.py --all --models LSTM GRU --workers 8 --threads 2
+    python prediction/train.py --symbols SBIN INFY --resume
+
+Each (symbol, model) job trains in a worker process whose TensorFlow/BLAS
+thread pools are pinned to --threads, so --workers x --threads covers the
+machine without oversubscription. Every epoch is checkpointed, so an
+interrupted run picks up where it stopped with --resume. Early stopping
+keeps the best weights. Finished models and their fitted scalers are
+written to models/<TYPE>/ as new versions, together with their NumPy
+exports (see numpy_runtime.py), and registered in models/registry.json.
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import argparse
+from datetime import datetime
+from concurrent.futures import as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+sys.path.append(os.path.join(HERE, "..", "app"))
+
+import numpy as np
+
+from windowing import make_windows, batches
+from numpy_runtime import export
+from pools import process_pool
+
+MODEL_TYPES = ("LSTM", "GRU")
+CHECKPOINT_DIR = os.path.join(HERE, "..", "models", ".checkpoints")
+
+
+def define_model(model_type, window_size):
+    """
+    The architectures from LSTM.ipynb and GRU.ipynb
+    """
+    from tensorflow import keras
+    from keras.layers import Input, Dense, Dropout, LSTM, GRU
+
+    inputs = Input(shape=(window_size, 1))
+    if model_type == "LSTM":
+        x = LSTM(units=64, return_sequences=True)(inputs)
+        x = Dropout(0.2)(x)
+        x = LSTM(units=64, return_sequences=True)(x)
+        x = Dropout(0.2)(x)
+        x = LSTM(units=64)(x)
+        x = Dropout(0.2)(x)
+        x = Dense(32, activation='softmax')(x)
+        optimizer = 'Nadam'
+    elif model_type == "GRU":
+        x = GRU(32, return_sequences=True)(inputs)
+        x = GRU(32, return_sequences=True)(x)
+        x = GRU(32)(x)
+        x = Dropout(0.20)(x)
+        optimizer = 'adam'
+    else:
+        raise ValueError(f"Unknown model type {model_type}")
+    model = keras.Model(inputs=inputs, outputs=[Dense(1)(x)])
+    model.compile(loss='mean_squared_error', optimizer=optimizer)
+    return model
+
+
+def _checkpoint_callback(directory, patience, min_delta):
+    """
+    Saves the model and early-stopping state after every epoch and the best
+    model whenever validation loss improves. Early stopping lives here too,
+    so its patience counter survives a resume.
+    """
+    from tensorflow import keras
+
+    class Checkpoint(keras.callbacks.Callback):
+
+        def __init__(self):
+            super().__init__()
+            self.state_path = os.path.join(directory, "state.json")
+            self.state = {"epoch": 0, "best": None, "wait": 0, "done": False}
+            if os.path.exists(self.state_path):
+                with open(self.state_path) as fp:
+                    self.state.update(json.load(fp))
+
+        def _save_state(self):
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w") as fp:
+                json.dump(self.state, fp)
+            os.replace(tmp, self.state_path)
+
+        def on_epoch_end(self, epoch, logs=None):
+            loss = (logs or {}).get("val_loss")
+            best = self.state["best"]
+            if best is None or loss < best - min_delta:
+                self.state.update(best=loss, wait=0)
+                self.model.save(os.path.join(directory, "best.keras"))
+            else:
+                self.state["wait"] += 1
+            self.model.save(os.path.join(directory, "last.keras"))
+            self.state["epoch"] = epoch + 1
+            if self.state["wait"] >= patience:
+                self.model.stop_training = True
+            self._save_state()
+
+        def finish(self):
+            self.state["done"] = True
+            self._save_state()
+
+    return Checkpoint()
+
+
+def _dataset(X, y, batch_size, shuffle=False, seed=None):
+    """
+    tf.data pipeline over windowing.batches(), so only one batch of windows
+    is ever copied out of the strided views. Shuffled datasets draw a new
+    order each epoch.
+    """
+    import itertools
+    import tensorflow as tf
+
+    seeds = itertools.count(seed or 0)
+    spec = (tf.TensorSpec((None,) + X.shape[1:], tf.float32), tf.TensorSpec((None,) + y.shape[1:], tf.float32))
+    return tf.data.Dataset.from_generator(
+        lambda: batches(X, y, batch_size, shuffle=shuffle, seed=next(seeds) if shuffle else None),
+        output_signature=spec,
+    ).apply(tf.data.experimental.assert_cardinality(-(-len(X) // batch_size))).prefetch(1)
+
+
+def train_one(symbol, model_type, closes, window_size=60, epochs=200, batch_size=32, patience=10,
+              min_delta=0.0, validation=0.1, seed=42, checkpoint_dir=CHECKPOINT_DIR, verbose=0):
+    """
+    Trains one model on a symbol's closing prices and returns a summary with
+    the paths of the best model and fitted scaler inside its checkpoint
+    directory. Picks up from an existing checkpoint there.
+    """
+    from tensorflow import keras
+    from sklearn.preprocessing import MinMaxScaler
+
+    directory = os.path.join(checkpoint_dir, model_type, symbol)
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    keras.utils.set_random_seed(seed)
+
+    closes = np.asarray(closes, dtype=np.float64).reshape(-1, 1)
+    split = int(len(closes) * (1 - validation))
+    if split <= window_size or len(closes) - split < 1:
+        raise ValueError(f"{symbol}: {len(closes)} rows are too few for a {window_size}-day window")
+    scaler = MinMaxScaler()
+    scaler.fit(closes[:split])
+    scaled = scaler.transform(closes).astype(np.float32)
+    X_train, y_train = make_windows(scaled[:split], window_size)
+    X_val, y_val = make_windows(scaled[split - window_size:], window_size)
+
+    checkpoint = _checkpoint_callback(directory, patience, min_delta)
+    last = os.path.join(directory, "last.keras")
+    if checkpoint.state["epoch"] and os.path.exists(last):
+        model = keras.models.load_model(last)
+    else:
+        model = define_model(model_type, window_size)
+    if not checkpoint.state["done"] and checkpoint.state["wait"] < patience and checkpoint.state["epoch"] < epochs:
+        model.fit(_dataset(X_train, y_train, batch_size, shuffle=True, seed=seed + checkpoint.state["epoch"]),
+                  validation_data=_dataset(X_val, y_val, batch_size), epochs=epochs,
+                  initial_epoch=checkpoint.state["epoch"], callbacks=[checkpoint], verbose=verbose)
+    checkpoint.finish()
+
+    model_path = os.path.join(directory, "best.keras")
+    export(model_path)
+    scaler_path = os.path.join(directory, "scaler.pkl")
+    with open(scaler_path, "wb") as f:
+        pickle.dump(scaler, f)
+    return {
+        "symbol": symbol,
+        "type": model_type,
+        "model_path": model_path,
+        "scaler_path": scaler_path,
+        "val_loss": checkpoint.state["best"],
+        "epochs": checkpoint.state["epoch"],
+        "window": window_size,
+        "rows": len(closes),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def publish(result, last_date):
+    """
+    Moves a finished job's artifacts into models/<TYPE>/ as the next version
+    and registers them. Runs in the parent process only, so the manifest
+    has a single writer.
+    """
+    from registry import registry
+
+    symbol = registry.canonical(result["symbol"])
+    version = registry.next_version(symbol, result["type"])
+    directory = os.path.join(registry.models_dir, result["type"])
+    os.makedirs(directory, exist_ok=True)
+    model_path = os.path.join(directory, f"{symbol}_v{version}.keras")
+    scaler_path = os.path.join(directory, f"{symbol}_v{version}_scaler.pkl")
+    shutil.copyfile(result["model_path"], model_path)
+    # After the .keras copy, so the export counts as current
+    shutil.copyfile(os.path.splitext(result["model_path"])[0] + ".npz", os.path.splitext(model_path)[0] + ".npz")
+    shutil.copyfile(result["scaler_path"], scaler_path)
+    entry = registry.register(
+        symbol, result["type"], model_path, version=version,
+        scaler=os.path.relpath(scaler_path, registry.models_dir),
+        window=result["window"], val_loss=result["val_loss"], epochs=result["epochs"],
+        rows=result["rows"], last_date=last_date, trained_at=datetime.now().isoformat(timespec="seconds"),
+    )
+    shutil.rmtree(os.path.dirname(result["model_path"]), ignore_errors=True)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--symbols", nargs="+")
+    group.add_argument("--all", action="store_true", help="every symbol in the data catalog")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_TYPES), choices=MODEL_TYPES)
+    parser.add_argument("--workers", type=int, help="training processes (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="TensorFlow/BLAS threads per worker")
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--patience", type=int, default=10)
+    parser.add_argument("--validation", type=float, default=0.1, help="trailing share of rows held out for early stopping")
+    parser.add_argument("--train-end", help="only train on rows up to this date (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--resume", action="store_true", help="continue from existing checkpoints")
+    parser.add_argument("--verbose", type=int, default=0)
+    args = parser.parse_args()
+
+    from catalog import get_catalog
+
+    catalog = get_catalog()
+    symbols = catalog.symbols() if args.all else args.symbols
+    workers = args.workers or max((os.cpu_count() or 1) // args.threads, 1)
+    if not args.resume:
+        shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+
+    jobs = {}
+    for symbol in symbols:
+        try:
+            data = catalog.load(symbol, columns=["CLOSE"], end=args.train_end)
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+            continue
+        last_date = data["DATE"].iloc[-1].strftime("%Y-%m-%d") if len(data) else None
+        for model_type in args.models:
+            jobs[(symbol, model_type)] = (data["CLOSE"].to_numpy(), last_date)
+
+    print(f"{len(jobs)} jobs on {workers} workers x {args.threads} threads")
+    failed = 0
+    with process_pool(workers, args.threads) as pool:
+        futures = {
+            pool.submit(train_one, symbol, model_type, closes, args.window, args.epochs, args.batch_size,
+                        args.patience, 0.0, args.validation, args.seed, CHECKPOINT_DIR, args.verbose): (symbol, model_type)
+            for (symbol, model_type), (closes, _) in jobs.items()
+        }
+        for future in as_completed(futures):
+            symbol, model_type = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{symbol} {model_type}: failed: {e}", file=sys.stderr)
+                continue
+            entry = publish(result, jobs[(symbol, model_type)][1])
+            print(f"{symbol} {model_type}: v{entry['version']} val_loss={result['val_loss']:.6f} "
+                  f"epochs={result['epochs']} {result['seconds']:.0f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
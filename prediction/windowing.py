@@ -0,0 +1,62 @@
+"""
+Sliding-window datasets for the sequence models, shared by training and the app.
+
+Windows are strided views over the source array, so building them costs
+O(n) memory whatever the window length. Copies are only made per batch,
+when the data is handed to the model.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FEATURES = ("OPEN", "HIGH", "LOW", "CLOSE", "VOLUME")
+
+
+def feature_matrix(df, columns=("CLOSE",), dtype=np.float32):
+    """
+    Returns the selected columns of a stock frame as an (n, features) array
+    """
+    return np.asarray(df[list(columns)].to_numpy(), dtype=dtype)
+
+
+def make_windows(values, window, horizon=1, stride=1, target=0):
+    """
+    Splits `values` ((n,) or (n, features)) into model inputs and targets.
+
+    X[i] = values[s : s + window] and y[i] = values[s + window : s + window + horizon, target]
+    with s = i * stride. X has shape (m, window, features) and y (m, horizon).
+    Both are read-only views into `values`.
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    count = len(values) - window - horizon + 1
+    if count <= 0:
+        features = values.shape[1]
+        return np.empty((0, window, features), values.dtype), np.empty((0, horizon), values.dtype)
+    X = sliding_window_view(values, window, axis=0)[:count:stride].transpose(0, 2, 1)
+    y = sliding_window_view(values[window:, target], horizon)[:count:stride]
+    return X, y
+
+
+def last_window(values, window):
+    """
+    The most recent `window` rows shaped (1, window, features), ready for forecasting
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    return values[np.newaxis, -window:]
+
+
+def batches(X, y=None, batch_size=256, shuffle=False, seed=None):
+    """
+    Yields contiguous copies of X (and y) one batch at a time, so peak memory
+    stays at one batch of windows on top of the source array
+    """
+    order = np.random.default_rng(seed).permutation(len(X)) if shuffle else None
+    for start in range(0, len(X), batch_size):
+        index = order[start:start + batch_size] if shuffle else slice(start, start + batch_size)
+        if y is None:
+            yield np.ascontiguousarray(X[index])
+        else:
+            yield np.ascontiguousarray(X[index]), np.ascontiguousarray(y[index])
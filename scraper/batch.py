@@ -0,0 +1,91 @@
+import asyncio
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from niftyScrape import NSEHistory, ChunkFetchError, break_dates, _parse_raw, pd
+from throttle import TokenBucket
+
+# Many-symbol scraping. Every chunk of every symbol waits on one semaphore
+# and runs on one thread pool, both sized to `concurrency`, and goes through
+# the same per-chunk retries (NSEHistory._stock_chunk) as a single-symbol scrape.
+
+
+async def stock_many(symbols, from_date, to_date, series="EQ", concurrency=8, as_frame=True, base_url=None, rate=None):
+    """
+    Fetches every symbol x date-chunk request with at most `concurrency` in
+    flight and yields (symbol, data) as soon as all chunks of a symbol are in.
+    `data` is a DataFrame when `as_frame` is set, the raw rows otherwise.
+
+    `rate` caps this batch at that many requests per second instead of the
+    process-wide NSEHistory.limiter (5 per second), which would otherwise
+    bound a large batch whatever the concurrency. Symbols whose chunks still
+    fail after the retries are left out and reported together in one
+    ChunkFetchError once the rest are yielded. Closing the generator early
+    cancels the chunks not yet started.
+    """
+    if as_frame and not pd:
+        raise ModuleNotFoundError("Please install pandas using \n pip install pandas")
+    ranges = list(reversed(list(break_dates(from_date, to_date, timedelta(days=NSEHistory.chunk_days)))))
+    loop = asyncio.get_running_loop()
+    h = NSEHistory()
+    h.workers = concurrency
+    if base_url:
+        h.base_url = base_url
+    if rate:
+        h.limiter = TokenBucket(rate=rate, capacity=max(1, int(rate)))
+    limit = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def fetch_chunk(symbol, chunk_from, chunk_to):
+        async with limit:
+            return await loop.run_in_executor(executor, h._stock_chunk, symbol, chunk_from, chunk_to, series)
+
+    async def fetch_symbol(symbol):
+        chunks = await asyncio.gather(*[fetch_chunk(symbol, f, t) for f, t in ranges], return_exceptions=True)
+        failed = [((symbol, f, t, series), c) for (f, t), c in zip(ranges, chunks) if isinstance(c, Exception)]
+        if failed:
+            raise ChunkFetchError(failed)
+        return symbol, [row for rows in chunks for row in rows]
+
+    h.prewarm([(s, f, t, series) for s in symbols for f, t in ranges][:concurrency])
+    tasks = [asyncio.ensure_future(fetch_symbol(s)) for s in symbols]
+    failed = []
+    try:
+        for finished in asyncio.as_completed(tasks):
+            try:
+                symbol, raw = await finished
+            except ChunkFetchError as e:
+                failed.extend(e.failed)
+                continue
+            if as_frame:
+                yield symbol, _parse_raw(raw) if raw else pd.DataFrame()
+            else:
+                yield symbol, raw
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        executor.shutdown(wait=False, cancel_futures=True)
+    if failed:
+        raise ChunkFetchError(failed)
+
+
+def iter_stock_many(symbols, from_date, to_date, series="EQ", **kwargs):
+    """
+    Blocking wrapper around stock_many for callers without an event loop,
+    such as Streamlit scripts. Yields (symbol, data) in completion order.
+    The loop runs on the calling thread, so closing this generator closes
+    stock_many and no new chunks start.
+    """
+    loop = asyncio.new_event_loop()
+    agen = stock_many(symbols, from_date, to_date, series, **kwargs)
+    try:
+        while True:
+            try:
+                item = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+
+
+class ChunkCache:
+    """
+    On-disk cache for NSE history chunks keyed by (symbol, series, from, to).
+
+    Chunks whose window closed before today never expire. The chunk that
+    contains today (or lies in the future) expires after `live_ttl` seconds.
+    Total size is bounded by `max_bytes`, least recently used files go first.
+    An in-memory LRU index with a running byte total is read from disk once,
+    so a put costs O(1). Going over the limit rescans the directory (other
+    processes may share it) and evicts down to `low_water` of max_bytes, so
+    the scan happens once per batch of evictions rather than once per put.
+    """
+
+    def __init__(self, cache_dir=".cache", max_bytes=256 * 1024 * 1024, live_ttl=60 * 60, low_water=0.9):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.live_ttl = live_ttl
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._index = None
+        self._total = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _scan(self):
+        """
+        Rebuilds the LRU index (oldest first) and byte total from disk; call with the lock held
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        self._index = OrderedDict((path, size) for _, path, size in entries)
+        self._total = sum(self._index.values())
+
+    def _touch(self, path, size=None):
+        with self._lock:
+            if self._index is None:
+                self._scan()
+            if size is None:
+                if path in self._index:
+                    self._index.move_to_end(path)
+                return False
+            self._total += size - self._index.pop(path, 0)
+            self._index[path] = size
+            return self._total > self.max_bytes
+
+    def _path(self, symbol, series, from_date, to_date):
+        key = "{}|{}|{}|{}".format(symbol, series, _day(from_date).isoformat(), _day(to_date).isoformat())
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "{}-{}.json".format(_safe(symbol), name))
+
+    def is_closed(self, to_date):
+        return _day(to_date) < date.today()
+
+    def has(self, symbol, series, from_date, to_date):
+        return os.path.exists(self._path(symbol, series, from_date, to_date))
+
+    def get(self, symbol, series, from_date, to_date):
+        path = self._path(symbol, series, from_date, to_date)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as fp:
+                entry = json.load(fp)
+            data = entry["data"]
+        except (OSError, ValueError, KeyError):
+            self._remove(path)
+            return None
+        # A chunk fetched while its window was still open may be missing rows,
+        # so it keeps expiring even after the window closes
+        if not entry.get("closed") and time.time() - entry.get("written", 0) > self.live_ttl:
+            self._remove(path)
+            return None
+        # Reads refresh the access time used for eviction
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self._touch(path)
+        return data
+
+    def put(self, symbol, series, from_date, to_date, data):
+        path = self._path(symbol, series, from_date, to_date)
+        tmp = "{}.{}.tmp".format(path, threading.get_ident())
+        with open(tmp, "w") as fp:
+            json.dump({"written": time.time(), "closed": self.is_closed(to_date), "data": data}, fp)
+        os.replace(tmp, path)
+        if self._touch(path, os.path.getsize(path)):
+            self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in
+        low_water x max_bytes, after re-reading the directory
+        """
+        with self._lock:
+            self._scan()
+            if self._total <= self.max_bytes:
+                return
+            target = self.max_bytes * self.low_water
+            while self._index and self._total > target:
+                path, size = self._index.popitem(last=False)
+                self._total -= size
+                self._unlink(path)
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    self._unlink(os.path.join(self.cache_dir, name))
+            self._index = OrderedDict()
+            self._total = 0
+
+    def _remove(self, path):
+        self._unlink(path)
+        with self._lock:
+            if self._index is not None and path in self._index:
+                self._total -= self._index.pop(path)
+
+    def _unlink(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _day(d):
+    if isinstance(d, datetime):
+        return d.date()
+    return d
+
+
+def _safe(symbol):
+    return "".join(c if c.isalnum() else "_" for c in symbol)
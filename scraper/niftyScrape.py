@@ -1,6 +1,10 @@
+import os
+import csv
+import time
 import itertools
+from contextlib import contextmanager
 from urllib.parse import urljoin
-from requests import Session
+from requests import RequestException
 from datetime import datetime, timedelta
 
 try:
@@ -11,6 +15,10 @@ except ImportError:
 
 import streamlit as st
 
+from cache import ChunkCache
+from throttle import TokenBucket, backoff, retry_after
+from sessions import get_pool
+
 def break_dates(from_date, to_date, delta=timedelta(days=30)):
     """
     Breaks date range into chunks of given delta (30 days by default)
@@ -36,6 +44,36 @@ def np_int(x):
     except:
         return 0
 
+def vec_date(values):
+    """
+    Parses a whole column of dates at once. Accepts the old DD-Mon-YYYY
+    format as well as the ISO dates the API returns now.
+    """
+    values = np.asarray(values, dtype=object)
+    dates = np.array(pd.to_datetime(values, format="%d-%b-%Y", errors="coerce").values)
+    missing = np.isnat(dates)
+    if missing.any():
+        dates[missing] = pd.to_datetime(values[missing], format="%Y-%m-%d", errors="coerce").values
+    return dates
+
+def vec_float(values):
+    """
+    Converts a whole column to float64, stripping thousands separators.
+    Anything unparseable becomes NaN.
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    text = pd.Series(values, dtype=object).astype(str).str.replace(",", "", regex=False)
+    return pd.to_numeric(text, errors="coerce").to_numpy(dtype=np.float64)
+
+def vec_int(values):
+    return np.nan_to_num(vec_float(values), nan=0).astype(np.int64)
+
+def vec_str(values):
+    return np.array(values, dtype=object)
+
 def pool(func, params, max_workers=2):
     """
     A simple thread pool implementation to parallelize API calls
@@ -46,7 +84,27 @@ def pool(func, params, max_workers=2):
         results = executor.map(lambda p: func(*p), params)
     return list(results)
 
+class ChunkFetchError(Exception):
+    """
+    Raised when some chunks still fail after all retry rounds.
+    `failed` holds (params, exception) pairs for those chunks only.
+    """
+
+    def __init__(self, failed):
+        self.failed = failed
+        super().__init__("{} chunk(s) failed: {}".format(len(failed), failed[0][1]))
+
 class NSEHistory:
+    # Shared by every instance and worker thread so pacing holds process-wide
+    limiter = TokenBucket(rate=5, capacity=5)
+
+    # Class-level defaults so callers of stock_csv/stock_df (which build their
+    # own instance) can tune them, e.g. to point at a local stand-in server
+    base_url = "https://www.nseindia.com"
+    workers = 8
+    chunk_days = 30
+    use_cache = True
+
     def __init__(self):
         self.headers = {
             "Host": "www.nseindia.com",
@@ -68,42 +126,157 @@ class NSEHistory:
             "derivatives": "/api/historical/fo/derivatives",
             "equity_quote_page": "/get-quotes/equity",
         }
-        self.base_url = "https://www.nseindia.com"
         self.cache_dir = ".cache"
-        self.workers = 2
+        self._cache = None
+        self.max_retries = 4
+        self.chunk_retries = 2
+        self.timeout = 30
         self.use_threads = True
         self.show_progress = False
 
-        self.s = Session()
-        self.s.headers.update(self.headers)
         self.ssl_verify = True
 
+    @property
+    def sessions(self):
+        """
+        Process-wide session pool for base_url, sized to the worker count
+        """
+        url = urljoin(self.base_url, self.path_map["equity_quote_page"])
+        return get_pool(url, self.headers, size=self.workers, ssl_verify=self.ssl_verify,
+                        timeout=self.timeout, limiter=self.limiter)
+
+    def prewarm(self, params):
+        """
+        Bootstraps a session for each chunk in `params` the cache cannot
+        serve, up to the worker count
+        """
+        if self.use_cache:
+            params = [p for p in params if not self.cache.has(p[0], p[3], p[1], p[2])]
+        if params:
+            self.sessions.prewarm(min(len(params), self.workers))
+
     def _get(self, path_name, params):
-        if "nseappid" not in self.s.cookies:
-            path = self.path_map["equity_quote_page"]
-            url = urljoin(self.base_url, path)
-            self.s.get(url, verify=self.ssl_verify)
+        pool = self.sessions
+        with pool.session() as s:
+            return self._get_with(pool, s, path_name, params)
+
+    def _get_with(self, pool, s, path_name, params):
         path = self.path_map[path_name]
         url = urljoin(self.base_url, path)
-        self.r = self.s.get(url, params=params, verify=self.ssl_verify)
-        return self.r
+        for attempt in range(self.max_retries + 1):
+            last_try = attempt == self.max_retries
+            self.limiter.acquire()
+            try:
+                r = s.get(url, params=params, verify=self.ssl_verify, timeout=self.timeout)
+            except RequestException:
+                if last_try:
+                    raise
+                time.sleep(backoff(attempt))
+                continue
+            if r.status_code in (401, 403):
+                # Session expired, fetch fresh cookies before retrying
+                if last_try:
+                    r.raise_for_status()
+                pool.bootstrap(s)
+            elif r.status_code == 429 or r.status_code >= 500:
+                if last_try:
+                    r.raise_for_status()
+                time.sleep(retry_after(r) or backoff(attempt))
+            else:
+                r.raise_for_status()
+                return r
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = ChunkCache(self.cache_dir)
+        return self._cache
 
     def _stock(self, symbol, from_date, to_date, series="EQ"):
+        if self.use_cache:
+            data = self.cache.get(symbol, series, from_date, to_date)
+            if data is not None:
+                return data
         params = {
             'symbol': symbol,
             'from': from_date.strftime('%d-%m-%Y'),
             'to': to_date.strftime('%d-%m-%Y'),
             'series': '["{}"]'.format(series),
         }
-        self.r = self._get("stock_history", params)
-        j = self.r.json()
+        r = self._get("stock_history", params)
+        j = r.json()
+        if self.use_cache:
+            self.cache.put(symbol, series, from_date, to_date, j['data'])
         return j['data']
 
-    def stock_raw(self, symbol, from_date, to_date, series="EQ"):
-        date_ranges = break_dates(from_date, to_date)
+    def _stock_chunk(self, symbol, from_date, to_date, series="EQ"):
+        """
+        _stock with up to chunk_retries more attempts, for chunks whose
+        requests still failed after _get's own retries
+        """
+        for attempt in range(self.chunk_retries + 1):
+            try:
+                return self._stock(symbol, from_date, to_date, series)
+            except Exception:
+                if attempt == self.chunk_retries:
+                    raise
+
+    def stock_raw(self, symbol, from_date, to_date, series="EQ", progress_callback=None):
+        date_ranges = break_dates(from_date, to_date, timedelta(days=self.chunk_days))
         params = [(symbol, x[0], x[1], series) for x in reversed(list(date_ranges))]
-        chunks = pool(self._stock, params, max_workers=self.workers)
-        return list(itertools.chain.from_iterable(chunks))
+        chunks = self.iter_chunks(params, progress_callback)
+        return list(itertools.chain.from_iterable(rows for _, rows in chunks))
+
+    def iter_chunks(self, params, progress_callback=None):
+        """
+        Yields (params, rows) for each chunk in `params` order while keeping at
+        most 2 x workers chunks in flight. `progress_callback(done, total)` is
+        called from the calling thread as chunks complete, in any order.
+        Each chunk goes through _stock_chunk's retries. Once one has failed
+        for good no new chunks start, the ones in flight finish, and
+        ChunkFetchError reports every chunk that failed.
+        Closing the generator early cancels the chunks not yet started.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        params = list(params)
+        window = self.workers * 2
+        self.prewarm(params[:window])
+        results = {}
+        in_flight = {}
+        failed = []
+        next_submit = next_yield = done = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def submit(i):
+                in_flight[executor.submit(self._stock_chunk, *params[i])] = i
+
+            try:
+                while next_yield < len(params):
+                    while not failed and next_submit < len(params) and next_submit < next_yield + window:
+                        submit(next_submit)
+                        next_submit += 1
+                    if not in_flight:
+                        break
+                    finished, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        i = in_flight.pop(future)
+                        try:
+                            results[i] = future.result()
+                        except Exception as e:
+                            failed.append((params[i], e))
+                            continue
+                        done += 1
+                        if progress_callback:
+                            progress_callback(done, len(params))
+                    while next_yield in results:
+                        yield params[next_yield], results.pop(next_yield)
+                        next_yield += 1
+            finally:
+                for future in in_flight:
+                    future.cancel()
+        if failed:
+            raise ChunkFetchError(failed)
 
 stock_select_headers = [
     "CH_TIMESTAMP", "CH_SERIES",
@@ -130,49 +303,235 @@ stock_dtypes = [
     np_float, np_float, np_float,
     np_int, np_float, np_int, str
 ]
+stock_vector_dtypes = [
+    vec_date, vec_str,
+    vec_float, vec_float,
+    vec_float, vec_float,
+    vec_float, vec_float,
+    vec_float, vec_float, vec_float,
+    vec_int, vec_float, vec_int, vec_str
+]
 
-def stock_csv(symbol, from_date, to_date, series="EQ", output="", show_progress=True, progress_callback=None):
-    h = NSEHistory()
-    h.show_progress = show_progress
+@contextmanager
+def _progress(show_progress, progress_callback=None):
+    """
+    Yields a (done, total) callback that also drives st.progress when show_progress is set
+    """
+    if not show_progress:
+        yield progress_callback
+        return
 
-    date_ranges = break_dates(from_date, to_date)
-    params = [(symbol, x[0], x[1], series) for x in reversed(list(date_ranges))]
-    
-    if show_progress:
-        with st.spinner('Scraping data...'):
-            progress_bar = st.progress(0)
-            total_steps = len(params)
-            current_step = 0
-
-            chunks = []
-            for p in params:
-                r = h._stock(*p)
-                chunks.append(r)
-                current_step += 1
-                progress_bar.progress(int(current_step / total_steps * 100))
-            
-            raw = list(itertools.chain.from_iterable(chunks))
-    else:
-        raw = h.stock_raw(symbol, from_date, to_date, series)
+    with st.spinner('Scraping data...'):
+        progress_bar = st.progress(0)
+
+        def on_progress(done, total):
+            progress_bar.progress(int(done / total * 100))
+            if progress_callback:
+                progress_callback(done, total)
+
+        yield on_progress
+
+def _fetch(h, symbol, from_date, to_date, series="EQ", show_progress=True, progress_callback=None):
+    with _progress(show_progress, progress_callback) as on_progress:
+        return h.stock_raw(symbol, from_date, to_date, series, progress_callback=on_progress)
+
+def _csv_row(row):
+    return [row.get(x) for x in stock_select_headers]
 
+def _parse_day(value):
+    value = str(value)
+    try:
+        return datetime.strptime(value[:10], "%Y-%m-%d")
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value[:11], "%d-%b-%Y")
+    except ValueError:
+        return None
+
+def _row_date(row):
+    return _parse_day(row.get("CH_TIMESTAMP")) or datetime.min
+
+def _write_csv(output, chunks):
+    """
+    Streams chunks of rows to `output` through a buffered csv writer as they
+    arrive. The file is only created once a row shows up and is moved into
+    place when complete, so a failed scrape never leaves a partial file.
+    """
+    tmp = output + ".tmp"
+    fp = None
+    try:
+        for rows in chunks:
+            if not rows:
+                continue
+            if fp is None:
+                fp = open(tmp, 'w', newline='', buffering=1 << 16)
+                writer = csv.writer(fp)
+                writer.writerow(stock_final_headers)
+            writer.writerows(_csv_row(row) for row in rows)
+    except BaseException:
+        if fp is not None:
+            fp.close()
+            os.remove(tmp)
+        raise
+    if fp is not None:
+        fp.close()
+        os.replace(tmp, output)
+
+def _tee_store(chunks, store, symbol, flush_rows=2048):
+    """
+    Passes chunks through while writing them to `store` in batches of about flush_rows
+    """
+    pending = []
+    for rows in chunks:
+        pending.extend(rows)
+        if len(pending) >= flush_rows:
+            store.write(symbol, _parse_raw(pending))
+            pending = []
+        yield rows
+    if pending:
+        store.write(symbol, _parse_raw(pending))
+
+def _resume_date(from_date, latest):
+    """
+    Returns the first date after `latest` that still needs fetching
+    """
+    if latest is None:
+        return from_date
+    latest = latest + timedelta(days=1)
+    if not isinstance(from_date, datetime):
+        latest = latest.date()
+    return max(from_date, latest)
+
+def stock_csv(symbol, from_date, to_date, series="EQ", output="", show_progress=True, progress_callback=None,
+              incremental=False, store=None, export_csv=True, oldest_first=False):
+    """
+    Streams the scraped rows to `output` as CSV, newest first unless oldest_first
+    is set. Each chunk is written as soon as it and every chunk before it have
+    arrived, so memory stays flat however long the range is. With `store`
+    (a store.ColumnStore) the rows are also written to the columnar store;
+    export_csv=False skips the CSV.
+    """
     if not output:
         output = "{}-{}-{}-{}.csv".format(symbol, from_date, to_date, series)
-    if raw:
-        with open(output, 'w') as fp:
-            fp.write(",".join(stock_final_headers) + '\n')
-            for row in raw:
-                row_select = [str(row[x]) for x in stock_select_headers]
-                line = ",".join(row_select) + '\n'
-                fp.write(line) 
+    if incremental:
+        if export_csv:
+            update_csv(symbol, output, from_date, to_date, series, show_progress=show_progress,
+                       progress_callback=progress_callback, oldest_first=oldest_first)
+        if store is not None:
+            update_store(symbol, store, from_date, to_date, series, show_progress=show_progress,
+                         progress_callback=progress_callback)
+        return output
+
+    h = NSEHistory()
+    h.show_progress = show_progress
+    date_ranges = list(break_dates(from_date, to_date, timedelta(days=h.chunk_days)))
+    if not oldest_first:
+        date_ranges.reverse()
+    params = [(symbol, x[0], x[1], series) for x in date_ranges]
+
+    with _progress(show_progress, progress_callback) as on_progress:
+        chunks = (rows for _, rows in h.iter_chunks(params, on_progress))
+        chunks = (sorted(rows, key=_row_date, reverse=not oldest_first) for rows in chunks)
+        if store is not None:
+            chunks = _tee_store(chunks, store, symbol)
+        if export_csv:
+            _write_csv(output, chunks)
+        else:
+            for _ in chunks:
+                pass
     return output
 
-def stock_df(symbol, from_date, to_date, series="EQ"):
+def update_store(symbol, store, from_date, to_date, series="EQ", show_progress=False, progress_callback=None):
+    """
+    Fetches only the rows newer than the latest DATE held in `store` for `symbol`.
+    Returns the number of rows written.
+    """
+    dates = store.read(symbol, columns=["DATE"])["DATE"]
+    latest = dates.max().to_pydatetime() if len(dates) else None
+    from_date = _resume_date(from_date, latest)
+    if from_date > to_date:
+        return 0
+    h = NSEHistory()
+    h.show_progress = show_progress
+    raw = _fetch(h, symbol, from_date, to_date, series, show_progress, progress_callback)
+    if not raw:
+        return 0
+    return store.write(symbol, _parse_raw(raw))
+
+def update_csv(symbol, output, from_date, to_date, series="EQ", show_progress=False, progress_callback=None,
+               oldest_first=False):
+    """
+    Appends only the rows newer than the latest DATE already in `output`.
+    Rows are merged without duplicates, newest first unless oldest_first is
+    set. Returns the number of rows added.
+    """
+    rows = {}
+    if os.path.exists(output):
+        with open(output, newline='') as fp:
+            reader = csv.reader(fp)
+            next(reader, None)
+            for row in reader:
+                d = _parse_day(row[0]) if row else None
+                if d is not None:
+                    rows[d] = row
+
+    from_date = _resume_date(from_date, max(rows) if rows else None)
+    if from_date > to_date:
+        return 0
+
+    h = NSEHistory()
+    h.show_progress = show_progress
+    raw = _fetch(h, symbol, from_date, to_date, series, show_progress, progress_callback)
+
+    before = len(rows)
+    for row in raw:
+        d = _parse_day(row.get("CH_TIMESTAMP"))
+        if d is not None:
+            rows[d] = _csv_row(row)
+    added = len(rows) - before
+    if added == 0:
+        return 0
+
+    tmp = output + ".tmp"
+    with open(tmp, 'w', newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(stock_final_headers)
+        writer.writerows(rows[d] for d in sorted(rows, reverse=not oldest_first))
+    os.replace(tmp, output)
+    return added
+
+def _parse_raw(raw):
+    """
+    Builds typed columns straight from the JSON rows with one batch
+    conversion per column instead of one Python call per cell
+    """
+    columns = {}
+    for select, final, parse in zip(stock_select_headers, stock_final_headers, stock_vector_dtypes):
+        columns[final] = parse([row.get(select) for row in raw])
+    return pd.DataFrame(columns, columns=stock_final_headers)
+
+def stock_df(symbol, from_date, to_date, series="EQ", existing=None):
+    """
+    With `existing`, only rows newer than its latest DATE are fetched and merged in.
+    The number of new rows is reported in `df.attrs["rows_added"]`.
+    """
     if not pd:
         raise ModuleNotFoundError("Please install pandas using \n pip install pandas")
+    if existing is not None and len(existing):
+        from_date = _resume_date(from_date, existing["DATE"].max().to_pydatetime())
+        if from_date > to_date:
+            df = existing.copy()
+            df.attrs["rows_added"] = 0
+            return df
     h = NSEHistory()
     raw = h.stock_raw(symbol, from_date, to_date, series)
-    df = pd.DataFrame(raw)[stock_select_headers]
-    df.columns = stock_final_headers
-    for i, h in enumerate(stock_final_headers):
-        df[h] = df[h].apply(stock_dtypes[i])
-    return df
\ No newline at end of file
+    df = _parse_raw(raw) if raw else pd.DataFrame(columns=stock_final_headers)
+    if existing is not None and len(existing):
+        df = pd.concat([df, existing], ignore_index=True)
+        df = df.drop_duplicates(subset=["DATE", "SERIES"], keep="first")
+        df = df.sort_values("DATE", ascending=False, ignore_index=True)
+        df.attrs["rows_added"] = len(df) - len(existing)
+    else:
+        df.attrs["rows_added"] = len(df)
+    return df
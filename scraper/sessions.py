@@ -0,0 +1,115 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from requests import Session
+
+
+class SessionPool:
+    """
+    Thread-safe pool of requests sessions that already hold the NSE cookies.
+
+    Each worker checks out its own session, so cookies and responses are never
+    shared between threads, and keep-alive connections are reused across
+    calls, symbols and NSEHistory instances in the same process.
+    """
+
+    def __init__(self, headers, bootstrap_url, size=8, ssl_verify=True, timeout=30, limiter=None):
+        self.headers = headers
+        self.bootstrap_url = bootstrap_url
+        self.size = size
+        self.ssl_verify = ssl_verify
+        self.timeout = timeout
+        self.limiter = limiter
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        s = Session()
+        s.headers.update(self.headers)
+        self.bootstrap(s)
+        return s
+
+    def bootstrap(self, s):
+        """
+        Visits the quote page to (re)acquire the session cookies
+        """
+        if self.limiter is not None:
+            self.limiter.acquire()
+        s.get(self.bootstrap_url, verify=self.ssl_verify, timeout=self.timeout)
+
+    def resize(self, size):
+        with self._lock:
+            self.size = max(self.size, size)
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if not create:
+            return self._idle.get()
+        try:
+            return self._new_session()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @contextmanager
+    def session(self):
+        s = self._checkout()
+        try:
+            yield s
+        finally:
+            self._idle.put(s)
+
+    def prewarm(self, count=None):
+        """
+        Creates and bootstraps sessions up front so the first requests skip
+        the cookie round trip. Sessions that fail to bootstrap are left for
+        checkout to retry. Returns the number of sessions created.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        count = min(count or self.size, self.size)
+        with self._lock:
+            count = max(0, count - self._created)
+            self._created += count
+        if not count:
+            return 0
+
+        def create(_):
+            try:
+                s = self._new_session()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                return None
+            self._idle.put(s)
+            return s
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            return sum(s is not None for s in executor.map(create, range(count)))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(bootstrap_url, headers, size=8, ssl_verify=True, timeout=30, limiter=None):
+    """
+    Returns the process-wide pool for `bootstrap_url`, growing it to `size` if needed
+    """
+    key = (bootstrap_url, ssl_verify)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SessionPool(headers, bootstrap_url, size, ssl_verify, timeout, limiter)
+    pool.resize(size)
+    return pool
@@ -0,0 +1,196 @@
+import os
+import json
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Typed layout of the columns produced by niftyScrape.stock_df
+column_dtypes = {
+    "DATE": "datetime64[ns]",
+    "SERIES": "U",
+    "OPEN": "float64",
+    "HIGH": "float64",
+    "LOW": "float64",
+    "PREV. CLOSE": "float64",
+    "LTP": "float64",
+    "CLOSE": "float64",
+    "VWAP": "float64",
+    "52W H": "float64",
+    "52W L": "float64",
+    "VOLUME": "int64",
+    "VALUE": "float64",
+    "NO OF TRADES": "int64",
+    "SYMBOL": "U",
+}
+
+
+# Column defaults for new dates in a write that lacks the column
+_empty = {"U": "", "int64": 0}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _file_name(column):
+    return "".join(c if c.isalnum() else "_" for c in column) + ".npy"
+
+
+def _symbol_lock(path):
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.RLock())
+
+
+class ColumnStore:
+    """
+    Columnar store of daily stock data, partitioned by symbol and year:
+
+        <root>/<SYMBOL>/<YEAR>/<COLUMN>.npy
+
+    Every column is a plain typed .npy array sorted by DATE, so readers can
+    memory-map just the columns and years they need. Writes to a symbol are
+    serialized by a per-symbol lock, which readers also take while listing
+    or opening partitions, so a session never sees a year half replaced.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol)
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def years(self, symbol):
+        path = self._symbol_dir(symbol)
+        with _symbol_lock(path):
+            if not os.path.isdir(path):
+                return []
+            return sorted(int(d) for d in os.listdir(path) if d.isdigit())
+
+    def _load_partition(self, symbol, year, columns, mmap_mode="r"):
+        path = os.path.join(self._symbol_dir(symbol), str(year))
+        return {c: np.load(os.path.join(path, _file_name(c)), mmap_mode=mmap_mode) for c in columns}
+
+    def _partition_columns(self, symbol, year):
+        path = os.path.join(self._symbol_dir(symbol), str(year))
+        try:
+            with open(os.path.join(path, "meta.json")) as fp:
+                return json.load(fp)["columns"]
+        except (OSError, ValueError, KeyError):
+            return [c for c in column_dtypes if os.path.exists(os.path.join(path, _file_name(c)))]
+
+    def write(self, symbol, df):
+        """
+        Merges a stock_df-style frame into the store. Rows for dates already
+        stored are replaced in the columns the frame has; its other columns
+        keep their stored values (new dates get NaN, 0 or ""). Returns the
+        number of rows written.
+        """
+        columns = [c for c in column_dtypes if c in df.columns]
+        if "DATE" not in columns:
+            raise ValueError("DataFrame needs a DATE column")
+        dates = pd.to_datetime(df["DATE"]).values
+        years = dates.astype("datetime64[Y]").astype(int) + 1970
+
+        with _symbol_lock(self._symbol_dir(symbol)):
+            for year in np.unique(years):
+                part = df.loc[years == year, columns].drop_duplicates(subset="DATE", keep="first")
+                part_columns = columns
+                if year in self.years(symbol):
+                    stored = self._partition_columns(symbol, year)
+                    old = pd.DataFrame(self._load_partition(symbol, year, stored, mmap_mode=None)).set_index("DATE")
+                    new = part.set_index("DATE")
+                    merged = new.combine_first(old)
+                    # Incoming values win even where they are NaN
+                    merged.loc[new.index, new.columns] = new
+                    part_columns = [c for c in column_dtypes if c in columns or c in stored]
+                    part = merged.reset_index()[part_columns]
+                part = part.sort_values("DATE")
+                self._write_partition(symbol, year, part, part_columns)
+        return len(df)
+
+    def _write_partition(self, symbol, year, part, columns):
+        final = os.path.join(self._symbol_dir(symbol), str(year))
+        token = "{}.{}".format(os.getpid(), threading.get_ident())
+        tmp = "{}.{}.tmp".format(final, token)
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for c in columns:
+            kind = column_dtypes[c]
+            values = part[c]
+            if kind in _empty:
+                values = values.fillna(_empty[kind])
+            values = values.to_numpy()
+            if kind == "U":
+                values = values.astype(str)
+            else:
+                values = values.astype(kind)
+            np.save(os.path.join(tmp, _file_name(c)), np.ascontiguousarray(values))
+        with open(os.path.join(tmp, "meta.json"), "w") as fp:
+            json.dump({"rows": len(part), "columns": columns}, fp)
+
+        old = "{}.{}.old".format(final, token)
+        if os.path.isdir(final):
+            os.replace(final, old)
+        os.replace(tmp, final)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def iter_partitions(self, symbol, columns=None, start=None, end=None):
+        """
+        Yields one dict of memory-mapped arrays per year, trimmed to
+        [start, end]. Slices of a memory map are views, so nothing is copied.
+        Columns a year was written without come back empty (NaN, 0 or "").
+        """
+        with _symbol_lock(self._symbol_dir(symbol)):
+            years = [
+                year for year in self.years(symbol)
+                if (start is None or year >= pd.Timestamp(start).year) and (end is None or year <= pd.Timestamp(end).year)
+            ]
+            stored = {year: self._partition_columns(symbol, year) for year in years}
+        if columns is None:
+            columns = [c for c in column_dtypes if any(c in s for s in stored.values())]
+        columns = list(columns)
+        if "DATE" not in columns:
+            columns = ["DATE"] + columns
+        lo = pd.Timestamp(start).to_datetime64() if start is not None else None
+        hi = pd.Timestamp(end).to_datetime64() if end is not None else None
+        for year in years:
+            with _symbol_lock(self._symbol_dir(symbol)):
+                arrays = self._load_partition(symbol, year, [c for c in columns if c in stored[year]])
+            rows = len(arrays["DATE"])
+            for c in columns:
+                if c not in arrays:
+                    kind = column_dtypes[c]
+                    arrays[c] = np.full(rows, _empty.get(kind, np.nan), dtype=kind if kind != "U" else "U1")
+            arrays = {c: arrays[c] for c in columns}
+            dates = arrays["DATE"]
+            i = np.searchsorted(dates, lo, side="left") if lo is not None else 0
+            j = np.searchsorted(dates, hi, side="right") if hi is not None else len(dates)
+            if i < j:
+                yield {c: a[i:j] for c, a in arrays.items()}
+
+    def read(self, symbol, columns=None, start=None, end=None):
+        """
+        Returns the selected columns and date range as a DataFrame sorted by DATE
+        """
+        parts = list(self.iter_partitions(symbol, columns, start, end))
+        if not parts:
+            return pd.DataFrame(columns=list(columns or column_dtypes))
+        if len(parts) == 1:
+            data = parts[0]
+        else:
+            data = {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+        return pd.DataFrame(data, copy=False)
+
+    def to_csv(self, symbol, output, newest_first=True):
+        df = self.read(symbol)
+        df = df.assign(DATE=df["DATE"].dt.strftime("%Y-%m-%d"))
+        if newest_first:
+            df = df.iloc[::-1]
+        df.to_csv(output, index=False)
+        return output
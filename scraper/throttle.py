@@ -0,0 +1,50 @@
+import time
+import random
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `rate` tokens are added per second up to
+    `capacity`; acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate=5.0, capacity=5):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def backoff(attempt, base=0.5, cap=16.0):
+    """
+    Full-jitter exponential backoff delay in seconds for the given attempt
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after(response):
+    """
+    Seconds requested by a Retry-After header, or None
+    """
+    value = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None